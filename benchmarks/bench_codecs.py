@@ -0,0 +1,61 @@
+"""Compare wire size and encode/decode CPU time of the registered codecs.
+
+    python -m benchmarks.bench_codecs [--iterations N]
+"""
+import argparse
+import random
+import string
+import timeit
+
+from wizeline.falcon.middlewares.codecs import create_default_registry
+
+
+def _text(size):
+    return ''.join(random.choice(string.ascii_letters + ' ') for _ in range(size))
+
+
+def _payloads():
+    random.seed(26)
+    message = {
+        'id': 'evt_123456',
+        'type': 'message',
+        'bot_id': 'B0001',
+        'user': {'id': 'U42', 'name': 'Ana', 'locale': 'es-MX'},
+        'text': _text(120),
+        'timestamp': 1508457600.123,
+    }
+    classification = {
+        'intents': [{'name': f'intent_{index}', 'confidence': random.random()} for index in range(20)],
+        'entities': [{'type': 'date', 'value': '2017-10-20', 'start': 4, 'end': 14}] * 5,
+    }
+    batch = {'events': [dict(message, id=f'evt_{index}') for index in range(200)]}
+    return [('message', message), ('classification', classification), ('batch', batch)]
+
+
+def _measure(codec, document, iterations):
+    encoded = codec.dumps(document)
+    encode = timeit.timeit(lambda: codec.dumps(document), number=iterations) / iterations
+    decode = timeit.timeit(lambda: codec.loads(encoded), number=iterations) / iterations
+    return len(encoded), encode * 1e6, decode * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    registry = create_default_registry()
+    codecs = {}
+    for media_type in registry.media_types():
+        codec = registry.for_content_type(media_type)
+        codecs[codec.media_type] = codec
+
+    print(f'{"payload":<16}{"codec":<24}{"bytes":>10}{"encode us":>12}{"decode us":>12}')
+    for name, document in _payloads():
+        for media_type, codec in codecs.items():
+            size, encode, decode = _measure(codec, document, args.iterations)
+            print(f'{name:<16}{media_type:<24}{size:>10}{encode:>12.1f}{decode:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
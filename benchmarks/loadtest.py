@@ -0,0 +1,330 @@
+"""Load test the middleware stack across worker counts.
+
+    python -m benchmarks.loadtest [--workers 1,2,4] [--requests N] [--concurrency N]
+                                  [--upstream-latency MS] [--replay FILE]
+
+A sample Falcon app using APISecretMiddleware, JSONMiddleware and
+BodyParserMiddleware is served by pre-forked wsgiref workers sharing one
+listening socket. Its resources call a local stub upstream, standing in
+for the bot backends. Clients replay a synthetic mix of webhook payloads
+(or the JSON lines of --replay, each one an object with `path`,
+`content_type`, `body` and an optional `valid_secret`) and the run reports
+throughput, latency percentiles and the RSS of every worker.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import socket
+import string
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlencode
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+SECRET = 'loadtest-secret'
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class _Upstream:
+    def __init__(self, url):
+        self._url = url
+
+    def call(self, document):
+        if self._url is None:
+            return {'ok': True}
+        request = urllib.request.Request(
+            self._url,
+            data=json.dumps(document).encode('utf-8'),
+            headers={'Content-Type': 'application/json'}
+        )
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read().decode('utf-8'))
+
+
+class WebhookResource:
+    disable_body_parser_middleware = True
+
+    def __init__(self, upstream):
+        self._upstream = upstream
+
+    def on_post(self, req, resp):
+        resp.json = self._upstream.call({'events': len(req.json.get('events', [req.json]))})
+
+
+class FormResource:
+    disable_json_middleware = True
+
+    def __init__(self, upstream):
+        self._upstream = upstream
+
+    def on_post(self, req, resp):
+        files = getattr(req, 'files', {})
+        result = self._upstream.call({'fields': len(req.json), 'files': len(files)})
+        resp.body = json.dumps(result)
+
+
+class HealthResource:
+    is_api_secret_required = False
+    disable_body_parser_middleware = True
+
+    def on_get(self, req, resp):
+        resp.json = {'status': 'ok'}
+
+
+def create_app(upstream_url=None):
+    import falcon
+    from wizeline.falcon.middlewares import APISecretMiddleware, BodyParserMiddleware, JSONMiddleware
+
+    upstream = _Upstream(upstream_url)
+    api = falcon.API(middleware=[
+        APISecretMiddleware(SECRET),
+        JSONMiddleware(),
+        BodyParserMiddleware(),
+    ])
+    api.add_route('/webhook', WebhookResource(upstream))
+    api.add_route('/form', FormResource(upstream))
+    api.add_route('/health', HealthResource())
+    return api
+
+
+def _upstream_app(latency):
+    def app(environ, start_response):
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+        environ['wsgi.input'].read(length)
+        if latency:
+            time.sleep(latency)
+        start_response('200 OK', [('Content-Type', 'application/json')])
+        return [b'{"ok": true}']
+    return app
+
+
+def _fork_servers(app, workers):
+    """Serve `app` from `workers` forked processes; returns (port, pids)."""
+    server = make_server('127.0.0.1', 0, app, server_class=WSGIServer, handler_class=_QuietHandler)
+    server.socket.listen(socket.SOMAXCONN)
+    pids = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, lambda *args: os._exit(0))
+            try:
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        pids.append(pid)
+    port = server.server_address[1]
+    server.socket.close()
+    return port, pids
+
+
+def _stop(pids):
+    for pid in pids:
+        os.kill(pid, signal.SIGTERM)
+    for pid in pids:
+        os.waitpid(pid, 0)
+
+
+def _rss(pid):
+    """Return (current, peak) resident set size of `pid` in KiB."""
+    values = {}
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            for line in status:
+                name, _, value = line.partition(':')
+                if name in ('VmRSS', 'VmHWM'):
+                    values[name] = int(value.split()[0])
+    except OSError:
+        pass
+    return values.get('VmRSS'), values.get('VmHWM')
+
+
+def _text(size):
+    return ''.join(random.choice(string.ascii_letters + ' ') for _ in range(size))
+
+
+def _message(index):
+    return {
+        'id': f'evt_{index}',
+        'type': 'message',
+        'user': {'id': 'U42', 'locale': 'es-MX'},
+        'text': _text(random.randint(20, 400)),
+    }
+
+
+def _json_body(document):
+    return 'application/json', json.dumps(document).encode('utf-8')
+
+
+def _multipart_body(fields, files):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, content in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{name}.bin"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'.encode() + content + b'\r\n'
+        )
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return f'multipart/form-data; boundary={boundary}', b''.join(parts)
+
+
+def _small_message():
+    return ('/webhook',) + _json_body(_message(random.randint(0, 10 ** 6))) + (True,)
+
+
+def _batch():
+    events = [_message(index) for index in range(random.randint(50, 500))]
+    return ('/webhook',) + _json_body({'events': events}) + (True,)
+
+
+def _form():
+    body = urlencode({'user': 'U42', 'text': _text(random.randint(20, 200)), 'channel': 'C1'}).encode('utf-8')
+    return '/form', 'application/x-www-form-urlencoded', body, True
+
+
+def _upload():
+    files = {'attachment': os.urandom(random.choice((1024, 64 * 1024, 512 * 1024)))}
+    return ('/form',) + _multipart_body({'user': 'U42'}, files) + (True,)
+
+
+def _invalid_secret():
+    return _small_message()[:3] + (False,)
+
+
+def _invalid_json():
+    return '/webhook', 'application/json', b'{"id": "evt_1", "text": ', True
+
+
+PROFILE = (
+    (_small_message, 60),
+    (_batch, 8),
+    (_form, 12),
+    (_upload, 5),
+    (_invalid_secret, 10),
+    (_invalid_json, 5),
+)
+
+
+def synthetic_requests(count, seed=40):
+    random.seed(seed)
+    builders = [builder for builder, _ in PROFILE]
+    weights = [weight for _, weight in PROFILE]
+    return [random.choices(builders, weights)[0]() for _ in range(count)]
+
+
+def replayed_requests(path):
+    requests = []
+    with open(path) as file:
+        for line in file:
+            if line.strip():
+                record = json.loads(line)
+                body = record.get('body', '')
+                if not isinstance(body, str):
+                    body = json.dumps(body)
+                requests.append((record['path'], record.get('content_type', 'application/json'),
+                                 body.encode('utf-8'), record.get('valid_secret', True)))
+    return requests
+
+
+def _send(port, requests):
+    results = []
+    for path, content_type, body, valid_secret in requests:
+        headers = {
+            'Content-Type': content_type,
+            'Authorization': SECRET if valid_secret else 'not-the-secret',
+        }
+        start = time.perf_counter()
+        connection = http.client.HTTPConnection('127.0.0.1', port)
+        try:
+            connection.request('POST', path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            status = 0
+        finally:
+            connection.close()
+        results.append((time.perf_counter() - start, status))
+    return results
+
+
+def _percentile(values, percent):
+    index = min(len(values) - 1, max(0, int(round(percent / 100.0 * len(values))) - 1))
+    return values[index]
+
+
+def run(workers, requests, concurrency, upstream_url):
+    port, pids = _fork_servers(create_app(upstream_url), workers)
+    try:
+        slices = [requests[index::concurrency] for index in range(concurrency)]
+        with ProcessPoolExecutor(concurrency) as executor:
+            start = time.perf_counter()
+            results = [result for chunk in executor.map(_send, [port] * concurrency, slices) for result in chunk]
+            elapsed = time.perf_counter() - start
+        rss = [_rss(pid) for pid in pids]
+    finally:
+        _stop(pids)
+
+    latencies = sorted(latency for latency, _ in results)
+    statuses = {}
+    for _, status in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    return {
+        'workers': workers,
+        'throughput': len(results) / elapsed,
+        'latency': {percent: _percentile(latencies, percent) * 1000 for percent in (50, 90, 99, 100)},
+        'statuses': statuses,
+        'rss': rss,
+    }
+
+
+def _report(result):
+    latency = result['latency']
+    print(f'{result["workers"]:>7}{result["throughput"]:>10.0f}'
+          f'{latency[50]:>9.1f}{latency[90]:>9.1f}{latency[99]:>9.1f}{latency[100]:>9.1f}  '
+          + ' '.join(f'{status}:{count}' for status, count in sorted(result['statuses'].items())))
+    for index, (rss, peak) in enumerate(result['rss']):
+        print(f'{"":>7}  worker {index}: rss {rss} KiB, peak {peak} KiB')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', default='1,2,4', help='comma separated worker counts')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--upstream-latency', type=float, default=2.0, help='stub upstream latency in ms')
+    parser.add_argument('--no-upstream', action='store_true', help='answer without calling the stub upstream')
+    parser.add_argument('--replay', help='JSON lines file of requests to replay instead of the synthetic mix')
+    args = parser.parse_args()
+
+    if args.replay:
+        requests = replayed_requests(args.replay)
+    else:
+        requests = synthetic_requests(args.requests)
+
+    upstream_pids = []
+    upstream_url = None
+    if not args.no_upstream:
+        upstream_port, upstream_pids = _fork_servers(_upstream_app(args.upstream_latency / 1000.0), 4)
+        upstream_url = f'http://127.0.0.1:{upstream_port}/'
+
+    try:
+        print(f'{"workers":>7}{"req/s":>10}{"p50 ms":>9}{"p90 ms":>9}{"p99 ms":>9}{"max ms":>9}  statuses')
+        for workers in (int(value) for value in args.workers.split(',')):
+            _report(run(workers, requests, args.concurrency, upstream_url))
+    finally:
+        _stop(upstream_pids)
+
+
+if __name__ == '__main__':
+    main()
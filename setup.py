@@ -41,4 +41,8 @@ setup(
     ],
     tests_require=requirements('requirements.txt') + requirements('requirements-dev.txt'),
     install_requires=requirements('requirements.txt'),
+    extras_require={
+        'msgpack': ['msgpack>=0.5'],
+        'cbor': ['cbor2>=4.0'],
+    },
 )
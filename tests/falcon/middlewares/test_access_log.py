@@ -0,0 +1,155 @@
+import json
+import logging
+import queue
+from unittest import TestCase
+
+import falcon
+from falcon import testing
+
+from wizeline.falcon.middlewares.access_log import AccessLogMiddleware, DroppingQueueHandler, create_queue_logger
+from wizeline.falcon.middlewares.body import get_body
+from wizeline.falcon.middlewares.json import JSONMiddleware
+
+from sure import expect
+
+ECHO_ROUTE = '/echo'
+FAIL_ROUTE = '/fail'
+FORM_ROUTE = '/form'
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        super(RecordingHandler, self).__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class EchoResource:
+    def on_post(self, req, resp):
+        resp.json = req.json
+
+
+class FormResource:
+    disable_json_middleware = True
+
+    def on_post(self, req, resp):
+        resp.body = str(len(get_body(req)))
+
+
+class FailingResource:
+    def on_get(self, req, resp):
+        raise falcon.HTTPInternalServerError()
+
+
+def _make_logger(name):
+    handler = RecordingHandler()
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.handlers = [handler]
+    return logger, handler
+
+
+class AccessLogMiddlewareTest(testing.TestCase):
+    def _make_app(self, **kwargs):
+        self._default_headers = None
+        self.logger, self.handler = _make_logger(f'tests.access.{self._testMethodName}')
+        self.app = falcon.API(middleware=[AccessLogMiddleware(logger=self.logger, **kwargs), JSONMiddleware()])
+        self.app.add_route(ECHO_ROUTE, EchoResource())
+        self.app.add_route(FAIL_ROUTE, FailingResource())
+        self.app.add_route(FORM_ROUTE, FormResource())
+
+    def _post(self, payload, **headers):
+        headers['content-type'] = 'application/json'
+        return self.simulate_post(ECHO_ROUTE, body=json.dumps(payload), headers=headers)
+
+    def test_one_structured_record_per_request(self):
+        self._make_app()
+        self._post({'hello': 'world'}, Authorization='top-secret')
+
+        expect(self.handler.records).to.have.length_of(1)
+        record = self.handler.records[0].access
+        expect(record['method']).to.equal('POST')
+        expect(record['route']).to.equal(ECHO_ROUTE)
+        expect(record['resource']).to.equal('EchoResource')
+        expect(record['status']).to.equal(200)
+        expect(record['request_size']).to.equal(len(json.dumps({'hello': 'world'})))
+        expect(record['response_size']).to.equal(len(json.dumps({'hello': 'world'})))
+        expect(record['phases_ms']).to.have.key('routing')
+        expect(record['phases_ms']).to.have.key('processing')
+        expect(json.loads(self.handler.records[0].getMessage())).to.equal(record)
+
+    def test_authorization_header_is_redacted(self):
+        self._make_app()
+        self._post({}, Authorization='top-secret')
+        record = self.handler.records[0].access
+        expect(record['headers']['authorization']).to.equal('[REDACTED]')
+        expect(self.handler.records[0].getMessage()).to_not.contain('top-secret')
+
+    def test_payload_is_truncated_and_redacted(self):
+        self._make_app(log_payload=True, max_payload_size=40)
+        self._post({'token': 'abc123', 'text': 'x' * 100})
+        payload = self.handler.records[0].access['payload']
+        expect(payload).to_not.contain('abc123')
+        expect(payload).to.contain('"token": "[REDACTED]"')
+        expect(payload).to.contain('bytes)')
+
+    def test_secret_straddling_the_limit_is_redacted(self):
+        self._make_app(log_payload=True, max_payload_size=40)
+        self._post({'user': 'ana', 'password': 'hunter2-super-secret-value'})
+        payload = self.handler.records[0].access['payload']
+        expect(payload).to_not.contain('hunter2')
+        expect(payload).to.contain('"password": "[REDACTED]"')
+        expect(payload).to.contain('bytes)')
+
+    def test_non_string_json_values_are_redacted(self):
+        self._make_app(log_payload=True)
+        self._post({'api_key': 123456, 'token': None, 'secret': True, 'count': 7})
+        payload = self.handler.records[0].access['payload']
+        expect(payload).to_not.contain('123456')
+        expect(payload).to_not.contain('true')
+        expect(json.loads(payload)).to.equal({
+            'api_key': '[REDACTED]', 'token': '[REDACTED]', 'secret': '[REDACTED]', 'count': 7
+        })
+
+    def test_form_values_are_redacted(self):
+        self._make_app(log_payload=True)
+        self.simulate_post(
+            FORM_ROUTE,
+            body='token=xoxb-SECRET&user=ana&password=hunter2&api_key%5B0%5D=k1',
+            headers={'content-type': 'application/x-www-form-urlencoded'}
+        )
+        payload = self.handler.records[0].access['payload']
+        expect(payload).to.equal('token=[REDACTED]&user=ana&password=[REDACTED]&api_key%5B0%5D=[REDACTED]')
+
+    def test_sampling_skips_requests(self):
+        self._make_app(sample_rate=0.0)
+        self._post({})
+        expect(self.handler.records).to.be.empty
+
+    def test_errors_are_always_logged(self):
+        self._make_app(sample_rate=0.0)
+        self.simulate_get(FAIL_ROUTE)
+        expect(self.handler.records).to.have.length_of(1)
+        expect(self.handler.records[0].access['status']).to.equal(500)
+
+
+class QueueLoggerTest(TestCase):
+    def test_records_are_forwarded_by_listener(self):
+        handler = RecordingHandler()
+        logger, listener = create_queue_logger('tests.access.queue', [handler])
+        listener.start()
+        logger.info('hello', extra={'access': {'status': 200}})
+        listener.stop()
+        expect(handler.records[0].access).to.equal({'status': 200})
+
+    def test_full_queue_drops_records(self):
+        handler = DroppingQueueHandler(queue.Queue(1))
+        logger = logging.getLogger('tests.access.dropping')
+        logger.propagate = False
+        logger.handlers = [handler]
+        logger.warning('first')
+        logger.warning('second')
+        expect(handler.dropped).to.equal(1)
@@ -0,0 +1,135 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+import falcon
+from falcon import testing
+from sure import expect
+
+from wizeline.falcon.middlewares.batching import Batcher, get_batch_result
+from wizeline.falcon.middlewares.json import JSONMiddleware
+from wizeline.falcon.middlewares.secret import APISecretMiddleware
+
+TEST_ROUTE = '/classify'
+
+
+class BatcherTest(TestCase):
+    def setUp(self):
+        self.batches = []
+        self.batcher = Batcher(self.handle, max_batch_size=4, max_wait=0.05)
+
+    def tearDown(self):
+        self.batcher.shutdown()
+
+    def handle(self, items):
+        self.batches.append(items)
+        return [item * 2 for item in items]
+
+    def test_groups_concurrent_items(self):
+        futures = [self.batcher.submit(index) for index in range(6)]
+
+        expect([future.result(1) for future in futures]).to.equal([0, 2, 4, 6, 8, 10])
+        expect(self.batches).to.equal([[0, 1, 2, 3], [4, 5]])
+
+    def test_handler_errors_reach_every_item(self):
+        batcher = Batcher(lambda items: 1 / 0, max_wait=0.01)
+        futures = [batcher.submit(index) for index in range(2)]
+
+        for future in futures:
+            future.result.when.called_with(1).should.throw(ZeroDivisionError)
+        batcher.shutdown()
+
+    def test_rejects_missing_results(self):
+        batcher = Batcher(lambda items: items[1:], max_wait=0.01)
+        futures = [batcher.submit(index) for index in range(2)]
+
+        futures[0].result.when.called_with(1).should.throw(RuntimeError)
+        batcher.shutdown()
+
+
+class ClassifierResource:
+    def __init__(self):
+        self.batches = []
+        self.batcher = Batcher(self.classify, max_batch_size=8, max_wait=0.05)
+
+    def classify(self, items):
+        self.batches.append(len(items))
+        if any(item.get('slow') for item in items):
+            threading.Event().wait(0.5)
+        return [{'intent': item['text'].split()[0]} for item in items]
+
+    def on_post(self, req, resp):
+        resp.json = get_batch_result(req, timeout=0.2)
+
+
+class RetryingResource(ClassifierResource):
+    def on_post(self, req, resp):
+        first = get_batch_result(req)
+        resp.json = {'first': first, 'second': get_batch_result(req)}
+
+
+class UnbatchedResource:
+    def on_get(self, req, resp):
+        resp.json = get_batch_result(req)
+
+
+class BatchingMiddlewareTest(testing.TestCase):
+    def setUp(self):
+        self._default_headers = None
+        self.app = falcon.API(middleware=[JSONMiddleware()])
+        self.resource = ClassifierResource()
+        self.app.add_route(TEST_ROUTE, self.resource)
+
+    def tearDown(self):
+        self.resource.batcher.shutdown()
+
+    def classify(self, document):
+        return self.simulate_post(TEST_ROUTE, body=json.dumps(document), headers={'content-type': 'application/json'})
+
+    def test_each_request_gets_its_result(self):
+        with ThreadPoolExecutor(4) as executor:
+            responses = list(executor.map(self.classify, [{'text': f'intent{index} hello'} for index in range(4)]))
+
+        expect([response.json for response in responses]).to.equal(
+            [{'intent': f'intent{index}'} for index in range(4)]
+        )
+        expect(sum(self.resource.batches)).to.equal(4)
+        expect(len(self.resource.batches)).to.be.lower_than(4)
+
+    def test_rejected_requests_are_not_batched(self):
+        self.app = falcon.API(middleware=[JSONMiddleware(), APISecretMiddleware('secret')])
+        self.app.add_route(TEST_ROUTE, self.resource)
+
+        response = self.classify({'text': 'greeting'})
+
+        expect(response.status).to.equal(falcon.HTTP_UNAUTHORIZED)
+        expect(self.resource.batches).to.be.empty
+
+    def test_repeated_calls_share_one_submission(self):
+        resource = RetryingResource()
+        self.app.add_route('/retrying', resource)
+
+        response = self.simulate_post(
+            '/retrying',
+            body=json.dumps({'text': 'greeting'}),
+            headers={'content-type': 'application/json'}
+        )
+        resource.batcher.shutdown()
+
+        expect(response.json).to.equal({'first': {'intent': 'greeting'}, 'second': {'intent': 'greeting'}})
+        expect(resource.batches).to.equal([1])
+
+    def test_result_of_request_not_batched(self):
+        self.app.add_route('/unbatched', UnbatchedResource())
+
+        response = self.simulate_get('/unbatched')
+
+        expect(response.status).to.equal(falcon.HTTP_INTERNAL_SERVER_ERROR)
+        expect(response.json['code']).to.equal('NotBatched')
+
+    def test_slow_batch_times_out(self):
+        response = self.classify({'text': 'greeting', 'slow': True})
+
+        expect(response.status).to.equal(falcon.HTTP_GATEWAY_TIMEOUT)
+        expect(response.json['code']).to.equal('BatchTimeout')
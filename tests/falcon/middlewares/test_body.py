@@ -0,0 +1,119 @@
+import json
+from unittest import TestCase
+
+import falcon
+from falcon import testing
+
+from wizeline.falcon.middlewares.body import BodyBufferMiddleware, RequestBody, get_body, iter_body
+from wizeline.falcon.middlewares.json import JSONMiddleware
+
+from sure import expect
+
+ECHO_ROUTE = '/echo'
+RAW_ROUTE = '/raw'
+
+
+class EchoResource:
+    def on_post(self, req, resp):
+        resp.json = req.json
+
+
+class RawResource:
+    disable_json_middleware = True
+
+    def __init__(self):
+        self.spilled = None
+
+    def on_post(self, req, resp):
+        body = get_body(req)
+        self.spilled = body.spilled
+        resp.body = body.decode()
+
+
+class RequestBodyTest(TestCase):
+    def _make_body(self, chunks, spill_threshold=16):
+        body = RequestBody(spill_threshold=spill_threshold)
+        for chunk in chunks:
+            body.write(chunk)
+        body.finish()
+        return body
+
+    def test_small_body_stays_in_memory(self):
+        body = self._make_body([b'hello ', b'world'])
+        expect(body.spilled).to.be.false
+        expect(len(body)).to.equal(11)
+        expect(body.view().tobytes()).to.equal(b'hello world')
+
+    def test_large_body_spills_to_file(self):
+        body = self._make_body([b'a' * 10, b'b' * 10, b'c' * 10])
+        expect(body.spilled).to.be.true
+        expect(len(body)).to.equal(30)
+        expect(body.tobytes()).to.equal(b'a' * 10 + b'b' * 10 + b'c' * 10)
+
+    def test_view_is_zero_copy(self):
+        body = self._make_body([b'hello world'])
+        view = body.view()
+        expect(view[6:].tobytes()).to.equal(b'world')
+        expect(view.obj).to.be(body.view().obj)
+
+    def test_decode(self):
+        body = self._make_body(['¡hola!'.encode('utf-8')])
+        expect(body.decode()).to.equal('¡hola!')
+
+    def test_open_reads_in_pieces(self):
+        body = self._make_body([b'line 1\n', b'line 2\n', b'line 3\n'])
+        expect(list(body.open())).to.equal([b'line 1\n', b'line 2\n', b'line 3\n'])
+
+    def test_close(self):
+        body = self._make_body([b'x' * 32])
+        body.close()
+        expect(body.spilled).to.be.false
+        expect(len(body)).to.equal(0)
+
+
+class IterBodyTest(TestCase):
+    def test_buffer_is_checked_when_iteration_starts(self):
+        req = falcon.Request(testing.create_environ(method='POST', body='hello'))
+        chunks = iter_body(req)
+        get_body(req)
+        expect(b''.join(bytes(chunk) for chunk in chunks)).to.equal(b'hello')
+
+    def test_streamed_body_can_not_be_buffered(self):
+        req = falcon.Request(testing.create_environ(method='POST', body='hello'))
+        expect(b''.join(iter_body(req))).to.equal(b'hello')
+        get_body.when.called_with(req).should.throw(RuntimeError)
+
+
+class BodyBufferMiddlewareTest(testing.TestCase):
+    def setUp(self):
+        self._default_headers = None
+        self.app = falcon.API(middleware=[
+            BodyBufferMiddleware(spill_threshold=32, max_size=1024),
+            JSONMiddleware()
+        ])
+        self.raw_resource = RawResource()
+        self.app.add_route(ECHO_ROUTE, EchoResource())
+        self.app.add_route(RAW_ROUTE, self.raw_resource)
+
+    def test_json_middleware_reads_shared_body(self):
+        payload = {'text': 'x' * 100}
+        response = self.simulate_post(
+            ECHO_ROUTE,
+            body=json.dumps(payload),
+            headers={'content-type': 'application/json'}
+        )
+        expect(response.json).to.equal(payload)
+
+    def test_handler_reads_spilled_body(self):
+        response = self.simulate_post(RAW_ROUTE, body='y' * 100)
+        expect(self.raw_resource.spilled).to.be.true
+        expect(response.text).to.equal('y' * 100)
+
+    def test_handler_reads_small_body(self):
+        response = self.simulate_post(RAW_ROUTE, body='small')
+        expect(self.raw_resource.spilled).to.be.false
+        expect(response.text).to.equal('small')
+
+    def test_body_too_large(self):
+        response = self.simulate_post(RAW_ROUTE, body='z' * 2048)
+        expect(response.status).to.equal(falcon.HTTP_REQUEST_ENTITY_TOO_LARGE)
@@ -203,3 +203,16 @@ class BodyParserMiddlewareTest(testing.TestCase):
 
         expect(self.disabled_resource.has_request_included_json()).to.be.false
         expect(self.disabled_resource.get_last_request()).to.not_have.property('json')
+
+    def test_post_with_invalid_json_payload(self):
+        payload = '{"text": "' + 'x' * 100000 + '", oops}'
+
+        response = self.simulate_post(
+            ECHO_ROUTE,
+            body=payload,
+            headers={'content-type': 'application/json'}
+        )
+
+        expect(response.status).to.equal(falcon.HTTP_INTERNAL_SERVER_ERROR)
+        expect(response.json['code']).to.equal('InvalidJSON')
+        expect(len(response.content)).to.be.lower_than(300)
@@ -0,0 +1,106 @@
+import json
+from unittest import TestCase, skipUnless
+
+import falcon
+from falcon import testing
+
+from wizeline.falcon.middlewares import codecs
+from wizeline.falcon.middlewares.codecs import JSON_CODEC, Codec, CodecRegistry
+from wizeline.falcon.middlewares.json import JSONMiddleware
+
+from sure import expect
+
+ECHO_ROUTE = '/echo'
+PAYLOAD = {'bot': 'wize', 'scores': [0.25, 0.75], 'tags': ['a', 'b']}
+
+
+class EchoResource:
+    def on_post(self, req, resp):
+        resp.json = req.json
+
+
+def _reversed_json_codec():
+    return Codec(
+        'application/x-reversed-json',
+        lambda data: json.loads(data[::-1].decode('utf-8')),
+        lambda document: json.dumps(document).encode('utf-8')[::-1]
+    )
+
+
+class CodecRegistryTest(TestCase):
+    def setUp(self):
+        self.custom_codec = _reversed_json_codec()
+        self.registry = CodecRegistry([JSON_CODEC, self.custom_codec])
+
+    def test_content_type_with_parameters(self):
+        expect(self.registry.for_content_type('application/json; charset=utf-8')).to.be(JSON_CODEC)
+        expect(self.registry.for_content_type('text/json')).to.be(JSON_CODEC)
+
+    def test_unknown_content_type(self):
+        expect(self.registry.for_content_type('text/plain')).to.be.none
+        expect(self.registry.for_content_type(None)).to.be.none
+
+    def test_accept_prefers_highest_quality(self):
+        accept = 'application/json;q=0.5, application/x-reversed-json'
+        expect(self.registry.for_accept(accept)).to.be(self.custom_codec)
+
+    def test_accept_wildcard_uses_default(self):
+        expect(self.registry.for_accept('*/*')).to.be(JSON_CODEC)
+
+    def test_accept_without_registered_codec(self):
+        expect(self.registry.for_accept('text/html')).to.be.none
+
+
+class JSONMiddlewareCodecTest(testing.TestCase):
+    def setUp(self):
+        self._default_headers = None
+        registry = codecs.create_default_registry()
+        registry.register(_reversed_json_codec())
+        self.app = falcon.API(middleware=[JSONMiddleware(codecs=registry)])
+        self.app.add_route(ECHO_ROUTE, EchoResource())
+
+    def _post(self, body, content_type, accept=None):
+        headers = {'content-type': content_type}
+        if accept:
+            headers['accept'] = accept
+        return self.simulate_post(ECHO_ROUTE, body=body, headers=headers)
+
+    def test_custom_codec_round_trip(self):
+        body = json.dumps(PAYLOAD).encode('utf-8')[::-1]
+        response = self._post(body, 'application/x-reversed-json', 'application/x-reversed-json')
+        expect(response.headers['content-type']).to.equal('application/x-reversed-json')
+        expect(json.loads(response.content[::-1])).to.equal(PAYLOAD)
+
+    def test_json_request_custom_response(self):
+        response = self._post(json.dumps(PAYLOAD), 'application/json', 'application/x-reversed-json')
+        expect(json.loads(response.content[::-1])).to.equal(PAYLOAD)
+
+    def test_unacceptable_falls_back_to_json(self):
+        response = self._post(json.dumps(PAYLOAD), 'application/json', 'text/html')
+        expect(response.json).to.equal(PAYLOAD)
+
+    def test_negotiated_responses_vary_on_accept(self):
+        custom = self._post(json.dumps(PAYLOAD), 'application/json', 'application/x-reversed-json')
+        default = self._post(json.dumps(PAYLOAD), 'application/json')
+        expect(custom.headers['vary']).to.equal('Accept')
+        expect(default.headers['vary']).to.equal('Accept')
+
+    def test_invalid_binary_payload(self):
+        response = self._post(b'not reversed json', 'application/x-reversed-json')
+        expect(response.status).to.equal(falcon.HTTP_BAD_REQUEST)
+
+    @skipUnless(codecs.is_available('msgpack'), 'msgpack is not installed')
+    def test_msgpack_round_trip(self):
+        import msgpack
+        body = msgpack.packb(PAYLOAD, use_bin_type=True)
+        response = self._post(body, 'application/msgpack', 'application/msgpack')
+        expect(response.headers['content-type']).to.equal('application/msgpack')
+        expect(msgpack.unpackb(response.content, raw=False)).to.equal(PAYLOAD)
+
+    @skipUnless(codecs.is_available('cbor2'), 'cbor2 is not installed')
+    def test_cbor_round_trip(self):
+        import cbor2
+        body = cbor2.dumps(PAYLOAD)
+        response = self._post(body, 'application/cbor', 'application/cbor')
+        expect(response.headers['content-type']).to.equal('application/cbor')
+        expect(cbor2.loads(response.content)).to.equal(PAYLOAD)
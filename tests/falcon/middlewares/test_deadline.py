@@ -0,0 +1,119 @@
+import json
+
+import falcon
+from falcon import testing
+
+from wizeline.falcon.middlewares.deadline import DeadlineMiddleware, check_deadline, remaining_time
+from wizeline.falcon.middlewares.json import JSONMiddleware
+
+from sure import expect
+
+BUDGET_ROUTE = '/budget'
+EXPENSIVE_ROUTE = '/expensive'
+SLOW_ROUTE = '/slow'
+
+
+class BudgetResource:
+    def __init__(self):
+        self.remaining = None
+
+    def on_get(self, req, resp):
+        self.remaining = remaining_time(req)
+        resp.json = {'remaining': self.remaining}
+
+    def on_post(self, req, resp):
+        resp.json = req.json
+
+
+class ExpensiveResource:
+    def on_get(self, req, resp):
+        check_deadline(req, required=1.0)
+        resp.json = {'done': True}
+
+
+class SlowResource(BudgetResource):
+    request_timeout = 30
+
+
+class DeadlineMiddlewareTest(testing.TestCase):
+    def setUp(self):
+        self._default_headers = None
+        self.app = falcon.API(middleware=[
+            DeadlineMiddleware(default_timeout=5, max_timeout=60),
+            JSONMiddleware()
+        ])
+
+        self.budget_resource = BudgetResource()
+        self.slow_resource = SlowResource()
+
+        self.app.add_route(BUDGET_ROUTE, self.budget_resource)
+        self.app.add_route(EXPENSIVE_ROUTE, ExpensiveResource())
+        self.app.add_route(SLOW_ROUTE, self.slow_resource)
+
+    def test_default_timeout(self):
+        self.simulate_get(BUDGET_ROUTE)
+        expect(self.budget_resource.remaining).to.be.within(4, 5)
+
+    def test_resource_timeout(self):
+        self.simulate_get(SLOW_ROUTE)
+        expect(self.slow_resource.remaining).to.be.within(29, 30)
+
+    def test_header_timeout_overrides_resource_timeout(self):
+        self.simulate_get(SLOW_ROUTE, headers={'X-Request-Timeout': '2.5'})
+        expect(self.slow_resource.remaining).to.be.within(1.5, 2.5)
+
+    def test_header_timeout_is_capped(self):
+        self.simulate_get(BUDGET_ROUTE, headers={'X-Request-Timeout': '3600'})
+        expect(self.budget_resource.remaining).to.be.within(59, 60)
+
+    def test_invalid_header_timeout(self):
+        response = self.simulate_get(BUDGET_ROUTE, headers={'X-Request-Timeout': 'soon'})
+        expect(response.status).to.equal(falcon.HTTP_BAD_REQUEST)
+
+    def test_non_finite_header_timeout(self):
+        for value in ('nan', 'inf', '-inf'):
+            response = self.simulate_get(BUDGET_ROUTE, headers={'X-Request-Timeout': value})
+            expect(response.status).to.equal(falcon.HTTP_BAD_REQUEST)
+
+    def test_check_deadline_without_budget(self):
+        response = self.simulate_get(EXPENSIVE_ROUTE, headers={'X-Request-Timeout': '0.5'})
+        expect(response.status).to.equal(falcon.HTTP_GATEWAY_TIMEOUT)
+        expect(response.json['code']).to.equal('DeadlineExceeded')
+
+    def test_check_deadline_with_budget(self):
+        response = self.simulate_get(EXPENSIVE_ROUTE)
+        expect(response.status).to.equal(falcon.HTTP_OK)
+
+    def test_expired_deadline_aborts_payload_read(self):
+        response = self.simulate_post(
+            BUDGET_ROUTE,
+            body=json.dumps({'hello': 'world'}),
+            headers={'content-type': 'application/json', 'X-Request-Timeout': '0'}
+        )
+        expect(response.status).to.equal(falcon.HTTP_REQUEST_TIMEOUT)
+        expect(response.json['code']).to.equal('DeadlineExceeded')
+
+    def test_payload_read_within_deadline(self):
+        response = self.simulate_post(
+            BUDGET_ROUTE,
+            body=json.dumps({'hello': 'world'}),
+            headers={'content-type': 'application/json'}
+        )
+        expect(response.json).to.equal({'hello': 'world'})
+
+
+class WithoutDeadlineMiddlewareTest(testing.TestCase):
+    def setUp(self):
+        self._default_headers = None
+        self.app = falcon.API()
+        self.budget_resource = BudgetResource()
+        self.app.add_route(BUDGET_ROUTE, self.budget_resource)
+        self.app.add_route(EXPENSIVE_ROUTE, ExpensiveResource())
+
+    def test_remaining_time_is_unbounded(self):
+        self.simulate_get(BUDGET_ROUTE)
+        expect(self.budget_resource.remaining).to.be.none
+
+    def test_check_deadline_is_noop(self):
+        response = self.simulate_get(EXPENSIVE_ROUTE)
+        expect(response.status).to.equal(falcon.HTTP_OK)
@@ -0,0 +1,131 @@
+import json
+from unittest import TestCase
+from urllib.parse import urlencode
+
+import falcon
+from falcon import testing
+
+from wizeline.falcon.middlewares.bodyParser import BodyParserMiddleware
+from wizeline.falcon.middlewares.form import FormParser, parse_form, parse_form_params
+
+from sure import expect
+
+ECHO_ROUTE = '/echo'
+SLACK_ROUTE = '/slack'
+
+
+class EchoResource:
+    def __init__(self):
+        self.last_json = None
+
+    def on_post(self, req, resp):
+        self.last_json = req.json
+        resp.json = req.json
+
+
+class SlackResource(EchoResource):
+    form_fields = {'payload': json.loads, 'count': int}
+
+
+class FormParserTest(TestCase):
+    def test_flat_fields(self):
+        expect(parse_form([b'hello=world&bot=wize+line'])).to.equal({'hello': 'world', 'bot': 'wize line'})
+
+    def test_percent_encoded_utf8(self):
+        expect(parse_form([urlencode({'text': '¡hola & adiós!'}).encode()])).to.equal({'text': '¡hola & adiós!'})
+
+    def test_repeated_keys(self):
+        expect(parse_form([b'tag=a&tag=b&tag=c'])).to.equal({'tag': ['a', 'b', 'c']})
+
+    def test_nested_keys(self):
+        body = urlencode([('user[name]', 'Ana'), ('user[team][id]', 'T1'), ('tags[]', 'a'), ('tags[]', 'b')])
+        expect(parse_form([body.encode()])).to.equal({
+            'user': {'name': 'Ana', 'team': {'id': 'T1'}},
+            'tags': ['a', 'b']
+        })
+
+    def test_list_of_objects(self):
+        body = urlencode([('items[][id]', '1'), ('items[][id]', '2')])
+        expect(parse_form([body.encode()])).to.equal({'items': [{'id': '1'}, {'id': '2'}]})
+
+    def test_fields_split_across_chunks(self):
+        body = urlencode({'first': 'a' * 50, 'second': 'b' * 50}).encode()
+        chunks = [body[i:i + 7] for i in range(0, len(body), 7)]
+        expect(parse_form(chunks)).to.equal({'first': 'a' * 50, 'second': 'b' * 50})
+
+    def test_undeclared_fields_are_skipped(self):
+        parser = FormParser(fields=('token',))
+        body = urlencode({'huge': 'x' * 1000, 'token': 'abc'}).encode()
+        for index in range(0, len(body), 16):
+            parser.feed(body[index:index + 16])
+            expect(len(parser._pending)).to.be.lower_than(32)
+        expect(parser.close()).to.equal({'token': 'abc'})
+
+    def test_typed_coercion(self):
+        body = urlencode({'payload': json.dumps({'type': 'block_actions'}), 'count': '3'}).encode()
+        expect(parse_form([body], {'payload': json.loads, 'count': int})).to.equal({
+            'payload': {'type': 'block_actions'},
+            'count': 3
+        })
+
+    def test_nesting_up_to_max_depth(self):
+        result = parse_form([b'a' + b'[x]' * 31 + b'=1'])
+        for _ in range(31):
+            result = result['a' if 'a' in result else 'x']
+        expect(result).to.equal({'x': '1'})
+
+    def test_params_already_parsed_by_falcon(self):
+        params = {'user[name]': 'Ana', 'tags[]': ['a', 'b'], 'count': '2'}
+        expect(parse_form_params(params, {'user': None, 'tags': None, 'count': int})).to.equal({
+            'user': {'name': 'Ana'},
+            'tags': ['a', 'b'],
+            'count': 2
+        })
+
+
+class BodyParserFormTest(testing.TestCase):
+    def setUp(self):
+        self._default_headers = None
+        self.app = falcon.API(middleware=[BodyParserMiddleware()])
+        self.echo_resource = EchoResource()
+        self.slack_resource = SlackResource()
+        self.app.add_route(ECHO_ROUTE, self.echo_resource)
+        self.app.add_route(SLACK_ROUTE, self.slack_resource)
+
+    def _post_form(self, route, payload):
+        return self.simulate_post(
+            route,
+            body=urlencode(payload),
+            headers={'content-type': 'application/x-www-form-urlencoded'}
+        )
+
+    def test_streamed_form(self):
+        self._post_form(ECHO_ROUTE, [('hello', 'world'), ('user[name]', 'Ana')])
+        expect(self.echo_resource.last_json).to.equal({'hello': 'world', 'user': {'name': 'Ana'}})
+
+    def test_declared_fields(self):
+        self._post_form(SLACK_ROUTE, {
+            'payload': json.dumps({'type': 'block_actions'}),
+            'count': '7',
+            'ignored': 'value'
+        })
+        expect(self.slack_resource.last_json).to.equal({'payload': {'type': 'block_actions'}, 'count': 7})
+
+    def test_invalid_embedded_json(self):
+        response = self._post_form(SLACK_ROUTE, {'payload': '{not json'})
+        expect(response.status).to.equal(falcon.HTTP_BAD_REQUEST)
+        expect(response.json['code']).to.equal('InvalidFormField')
+
+    def test_invalid_utf8(self):
+        response = self.simulate_post(
+            ECHO_ROUTE,
+            body='a=%FF',
+            headers={'content-type': 'application/x-www-form-urlencoded'}
+        )
+        expect(response.status).to.equal(falcon.HTTP_BAD_REQUEST)
+        expect(response.json['code']).to.equal('InvalidForm')
+
+    def test_nesting_is_bounded(self):
+        response = self._post_form(ECHO_ROUTE, {'a' + '[x]' * 5000: 'deep'})
+        expect(response.status).to.equal(falcon.HTTP_BAD_REQUEST)
+        expect(response.json['code']).to.equal('InvalidForm')
@@ -0,0 +1,51 @@
+import subprocess
+import sys
+from unittest import TestCase
+
+from sure import expect
+
+IMPORT_TIME_BUDGET = 0.1
+
+
+def run_python(code):
+    output = subprocess.check_output([sys.executable, '-c', code])
+    return output.decode('utf-8').split()
+
+
+class LazyImportTest(TestCase):
+    def test_importing_the_package_does_not_load_the_middlewares(self):
+        loaded = run_python(
+            'import sys\n'
+            'import wizeline.falcon.middlewares\n'
+            'print(*sorted(name for name in ("falcon", "msgpack", "cbor2", "wizeline.falcon.middlewares.json")'
+            ' if name in sys.modules))'
+        )
+
+        expect(loaded).to.equal([])
+
+    def test_middlewares_are_loaded_on_first_access(self):
+        loaded = run_python(
+            'import sys\n'
+            'import wizeline.falcon.middlewares as middlewares\n'
+            'middlewares.JSONMiddleware\n'
+            'print("falcon" in sys.modules, "msgpack" in sys.modules, "cbor2" in sys.modules)'
+        )
+
+        expect(loaded).to.equal(['True', 'False', 'False'])
+
+    def test_import_time_stays_within_budget(self):
+        elapsed, = run_python(
+            'import time\n'
+            'start = time.perf_counter()\n'
+            'import wizeline.falcon.middlewares\n'
+            'import wizeline.falcon.errors\n'
+            'print(time.perf_counter() - start)'
+        )
+
+        expect(float(elapsed)).to.be.lower_than(IMPORT_TIME_BUDGET)
+
+    def test_unknown_attributes_raise_attribute_error(self):
+        import wizeline.falcon.middlewares as middlewares
+
+        expect(lambda: middlewares.NotAMiddleware).to.throw(AttributeError)
+        expect(dir(middlewares)).to.contain('JSONMiddleware')
@@ -3,6 +3,7 @@ import json
 import falcon
 from falcon import testing
 
+from wizeline.falcon.errors.http import HTTPBadRequest
 from wizeline.falcon.middlewares.json import JSONMiddleware
 
 from sure import expect
@@ -199,3 +200,89 @@ class JSONMiddlewareTest(testing.TestCase):
 
         expect(self.disabled_resource.has_request_included_json()).to.be.false
         expect(self.disabled_resource.get_last_request()).to.not_have.property('json')
+
+
+class JSONMiddlewareErrorDetailTest(testing.TestCase):
+    def _make_app(self, **kwargs):
+        self._default_headers = None
+        self.app = falcon.API(middleware=[JSONMiddleware(**kwargs)])
+        self.app.add_route(ECHO_ROUTE, EchoResource())
+        self.settable_resource = SettableResource()
+        self.app.add_route(SETTABLE_ROUTE, self.settable_resource)
+
+    def _post_invalid(self):
+        payload = '{"text": "' + 'x' * 100000 + '", oops}'
+        return self.simulate_post(ECHO_ROUTE, body=payload, headers={'content-type': 'application/json'})
+
+    def test_snippet_is_bounded(self):
+        self._make_app(snippet_size=10)
+        response = self._post_invalid()
+        expect(response.status).to.equal(falcon.HTTP_BAD_REQUEST)
+        expect(response.json['code']).to.equal('InvalidJSON')
+        expect(response.json['message']).to.contain('(char 100013)')
+        expect(response.json['message']).to.contain("near 'xxxxxxx\", oops}'")
+        expect(len(response.content)).to.be.lower_than(300)
+
+    def test_position_only(self):
+        self._make_app(error_detail='position')
+        response = self._post_invalid()
+        expect(response.json['message']).to.contain('line 1 column 100014')
+        expect(response.json['message']).to_not.contain('near')
+
+    def test_no_detail(self):
+        self._make_app(error_detail='none')
+        response = self._post_invalid()
+        expect(response.json['message']).to.equal('Invalid JSON received')
+
+    def test_invalid_response_does_not_embed_payload(self):
+        self._make_app()
+        self.settable_resource.set_json('x' * 100000)
+        response = self.simulate_get(SETTABLE_ROUTE)
+        expect(response.status).to.equal(falcon.HTTP_INTERNAL_SERVER_ERROR)
+        expect(response.json['code']).to.equal('InvalidResponse')
+        expect(len(response.content)).to.be.lower_than(300)
+
+    def test_unknown_detail_level(self):
+        JSONMiddleware.when.called_with(error_detail='everything').should.throw(ValueError)
+
+
+class MetaResource:
+    def on_get(self, req, resp):
+        resp.json = [{'id': 1}, {'id': 2}]
+        resp.meta = {'page': 1}
+
+    def on_post(self, req, resp):
+        raise HTTPBadRequest(code='InvalidBot', message='The bot is not valid')
+
+
+class JSONMiddlewareEnvelopeTest(testing.TestCase):
+    def setUp(self):
+        self._default_headers = None
+        json_middleware = JSONMiddleware(envelope=True)
+        self.app = falcon.API(middleware=[json_middleware])
+        self.app.set_error_serializer(json_middleware.serialize_error)
+        self.settable_resource = SettableResource()
+        self.app.add_route(SETTABLE_ROUTE, self.settable_resource)
+        self.app.add_route('/meta', MetaResource())
+
+    def test_wraps_response_with_meta(self):
+        response = self.simulate_get('/meta')
+        expect(response.json).to.equal({'data': [{'id': 1}, {'id': 2}], 'meta': {'page': 1}})
+
+    def test_wraps_response_without_meta(self):
+        self.settable_resource.set_json({'hello': 'world'})
+        response = self.simulate_get(SETTABLE_ROUTE)
+        expect(response.json).to.equal({'data': {'hello': 'world'}, 'meta': {}})
+
+    def test_leaves_text_responses_alone(self):
+        self.settable_resource.set_text('Hello')
+        response = self.simulate_get(SETTABLE_ROUTE)
+        expect(response.text).to.equal('Hello')
+
+    def test_wraps_errors(self):
+        response = self.simulate_post('/meta', body='{}', headers={'content-type': 'application/json'})
+        expect(response.status).to.equal(falcon.HTTP_BAD_REQUEST)
+        expect(response.json).to.equal({
+            'error': {'status': falcon.HTTP_BAD_REQUEST, 'code': 'InvalidBot', 'message': 'The bot is not valid'}
+        })
+        expect(response.headers['content-type']).to.equal('application/json')
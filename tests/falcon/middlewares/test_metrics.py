@@ -0,0 +1,126 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import falcon
+from falcon import testing
+
+from wizeline.falcon.middlewares.json import JSONMiddleware
+from wizeline.falcon.middlewares.metrics import MetricsRegistry, MetricsResource, instrument
+from wizeline.falcon.middlewares.secret import APISecretMiddleware
+
+from sure import expect
+
+ECHO_ROUTE = '/echo'
+METRICS_ROUTE = '/metrics'
+
+
+class EchoResource:
+    def on_post(self, req, resp):
+        resp.json = req.json
+
+
+class MetricsRegistryTest(TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter(self):
+        counter = self.registry.counter('bot_messages', 'Messages handled', ('bot',))
+        counter.labels('wize').inc()
+        counter.labels('wize').inc(2)
+        counter.labels('other "bot"').inc()
+
+        output = self.registry.render()
+        expect(output).to.contain('# HELP bot_messages Messages handled\n# TYPE bot_messages counter\n')
+        expect(output).to.contain('bot_messages_total{bot="wize"} 3\n')
+        expect(output).to.contain('bot_messages_total{bot="other \\"bot\\""} 1\n')
+
+    def test_histogram(self):
+        histogram = self.registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 3.0):
+            histogram.observe(value)
+
+        output = self.registry.render()
+        expect(output).to.contain('latency_seconds_bucket{le="0.1"} 1\n')
+        expect(output).to.contain('latency_seconds_bucket{le="1.0"} 3\n')
+        expect(output).to.contain('latency_seconds_bucket{le="+Inf"} 4\n')
+        expect(output).to.contain('latency_seconds_sum 4.25\n')
+        expect(output).to.contain('latency_seconds_count 4\n')
+
+    def test_registering_twice_returns_same_metric(self):
+        counter = self.registry.counter('hits', 'Hits')
+        expect(self.registry.counter('hits', 'Hits')).to.be(counter)
+        self.registry.histogram.when.called_with('hits', 'Hits').should.throw(ValueError)
+
+    def test_wrong_number_of_labels(self):
+        counter = self.registry.counter('hits', 'Hits', ('route',))
+        counter.labels.when.called_with('a', 'b').should.throw(ValueError)
+
+
+class SharedMetricsRegistryTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.registry = MetricsRegistry(self.directory)
+        self.counter = self.registry.counter('jobs', 'Jobs', ('kind',))
+
+    def tearDown(self):
+        self.registry.close()
+        shutil.rmtree(self.directory)
+
+    def test_values_are_aggregated_across_forked_workers(self):
+        self.counter.labels('parse').inc()
+        for _ in range(2):
+            pid = os.fork()
+            if pid == 0:
+                self.counter.labels('parse').inc(10)
+                self.counter.labels(f'child-{os.getpid()}').inc()
+                os._exit(0)
+            os.waitpid(pid, 0)
+
+        output = self.registry.render()
+        expect(output).to.contain('jobs_total{kind="parse"} 21\n')
+        expect(output.count('kind="child-')).to.equal(2)
+        expect(os.listdir(self.directory)).to.have.length_of(3)
+
+    def test_file_grows_with_many_series(self):
+        for index in range(3000):
+            self.counter.labels(f'kind-{index}').inc()
+        output = self.registry.render()
+        expect(output).to.contain('jobs_total{kind="kind-2999"} 1\n')
+
+
+class InstrumentedMiddlewareTest(testing.TestCase):
+    def setUp(self):
+        self._default_headers = None
+        self.registry = MetricsRegistry()
+        self.app = falcon.API(middleware=[
+            instrument(APISecretMiddleware('secret'), self.registry),
+            instrument(JSONMiddleware(), self.registry)
+        ])
+        self.app.add_route(ECHO_ROUTE, EchoResource())
+        self.app.add_route(METRICS_ROUTE, MetricsResource(self.registry))
+
+    def test_rejections_and_body_sizes(self):
+        self.simulate_post(ECHO_ROUTE, body='{}', headers={'content-type': 'application/json'})
+        self.simulate_post(ECHO_ROUTE, body='hi', headers={'content-type': 'text/plain', 'Authorization': 'secret'})
+        response = self.simulate_post(
+            ECHO_ROUTE,
+            body=json.dumps({'text': 'x' * 300}),
+            headers={'content-type': 'application/json', 'Authorization': 'secret'}
+        )
+        expect(response.status).to.equal(falcon.HTTP_OK)
+
+        response = self.simulate_get(METRICS_ROUTE, headers={'Authorization': 'secret'})
+        expect(response.headers['content-type']).to.contain('text/plain')
+        output = response.text
+        expect(output).to.contain(
+            'wizeline_middleware_rejections_total{middleware="APISecretMiddleware",status="401"} 1'
+        )
+        expect(output).to.contain(
+            'wizeline_middleware_rejections_total{middleware="JSONMiddleware",status="415"} 1'
+        )
+        expect(output).to.contain('wizeline_middleware_requests_total{middleware="APISecretMiddleware"} 4')
+        expect(output).to.contain('wizeline_request_body_bytes_bucket{middleware="JSONMiddleware",le="256.0"} 1')
+        expect(output).to.contain('wizeline_request_body_bytes_count{middleware="JSONMiddleware"} 2')
@@ -0,0 +1,137 @@
+import json
+from unittest import TestCase
+
+import falcon
+from falcon import testing
+
+from wizeline.falcon.errors.http import HTTPBadRequest
+from wizeline.falcon.middlewares.bodyParser import BodyParserMiddleware
+from wizeline.falcon.middlewares.multipart import MultipartParser, parse_header, parse_multipart
+
+from sure import expect
+
+UPLOAD_ROUTE = '/upload'
+BOUNDARY = 'wizeline-boundary'
+
+
+def _encode(parts, boundary=BOUNDARY):
+    body = b''
+    for headers, content in parts:
+        body += b'--' + boundary.encode() + b'\r\n'
+        for name, value in headers.items():
+            body += f'{name}: {value}\r\n'.encode()
+        body += b'\r\n' + content + b'\r\n'
+    return body + b'--' + boundary.encode() + b'--\r\n'
+
+
+def _field(name, value, content_type=None):
+    headers = {'Content-Disposition': f'form-data; name="{name}"'}
+    if content_type:
+        headers['Content-Type'] = content_type
+    return headers, value
+
+
+def _file(name, filename, content, content_type='application/octet-stream'):
+    return {
+        'Content-Disposition': f'form-data; name="{name}"; filename="{filename}"',
+        'Content-Type': content_type
+    }, content
+
+
+class UploadResource:
+    def __init__(self):
+        self.fields = None
+        self.files = None
+
+    def on_post(self, req, resp):
+        self.fields = req.json
+        self.files = {name: (upload.filename, upload.content_type, upload.read())
+                      for name, upload in req.files.items()}
+        resp.json = {'ok': True}
+
+
+class MultipartParserTest(TestCase):
+    def test_text_json_and_file_parts(self):
+        body = _encode([
+            _field('text', b'hello'),
+            _field('meta', json.dumps({'bot': 'wize'}).encode(), 'application/json'),
+            _file('image', 'cat.png', b'\x89PNG\r\n--not-a-boundary\r\n' * 10, 'image/png')
+        ])
+        fields, files = parse_multipart([body], BOUNDARY)
+        expect(fields).to.equal({'text': 'hello', 'meta': {'bot': 'wize'}})
+        expect(files['image'].filename).to.equal('cat.png')
+        expect(files['image'].content_type).to.equal('image/png')
+        expect(files['image'].size).to.equal(len(b'\x89PNG\r\n--not-a-boundary\r\n' * 10))
+        expect(files['image'].read()).to.equal(b'\x89PNG\r\n--not-a-boundary\r\n' * 10)
+
+    def test_byte_by_byte_feeding(self):
+        body = b'preamble\r\n' + _encode([_field('a', b'1'), _field('a', b'2'), _file('f', 'x.txt', b'data')])
+        parser = MultipartParser(BOUNDARY)
+        for index in range(len(body)):
+            parser.feed(body[index:index + 1])
+        fields, files = parser.close()
+        expect(fields).to.equal({'a': ['1', '2']})
+        expect(files['f'].read()).to.equal(b'data')
+
+    def test_file_is_spooled_to_disk(self):
+        body = _encode([_file('f', 'big.bin', b'x' * 4096)])
+        fields, files = parse_multipart([body], BOUNDARY, spool_size=1024)
+        expect(files['f'].stream._rolled).to.be.true
+        files['f'].close()
+
+    def test_part_size_limit(self):
+        body = _encode([_file('f', 'big.bin', b'x' * 4096)])
+        parse_multipart.when.called_with([body], BOUNDARY, max_part_size=1024).should.throw(
+            falcon.HTTPRequestEntityTooLarge
+        )
+
+    def test_total_size_limit(self):
+        body = _encode([_field('a', b'x' * 600), _field('b', b'y' * 600)])
+        parse_multipart.when.called_with([body], BOUNDARY, max_size=1000).should.throw(
+            falcon.HTTPRequestEntityTooLarge
+        )
+
+    def test_incomplete_body(self):
+        body = _encode([_field('a', b'1')])[:-10]
+        parse_multipart.when.called_with([body], BOUNDARY).should.throw(HTTPBadRequest)
+
+    def test_parse_header(self):
+        expect(parse_header('form-data; name="file"; filename="a \\"b\\".txt"')).to.equal(
+            ('form-data', {'name': 'file', 'filename': 'a "b".txt'})
+        )
+
+
+class BodyParserMultipartTest(testing.TestCase):
+    def setUp(self):
+        self._default_headers = None
+        self.app = falcon.API(middleware=[BodyParserMiddleware(max_part_size=1024)])
+        self.upload_resource = UploadResource()
+        self.app.add_route(UPLOAD_ROUTE, self.upload_resource)
+
+    def _post(self, body, content_type=f'multipart/form-data; boundary={BOUNDARY}'):
+        return self.simulate_post(UPLOAD_ROUTE, body=body, headers={'content-type': content_type})
+
+    def test_upload(self):
+        response = self._post(_encode([
+            _field('event', json.dumps({'type': 'message'}).encode(), 'application/json'),
+            _file('audio', 'voice.ogg', b'OggS' * 16, 'audio/ogg')
+        ]))
+        expect(response.status).to.equal(falcon.HTTP_OK)
+        expect(self.upload_resource.fields).to.equal({'event': {'type': 'message'}})
+        expect(self.upload_resource.files).to.equal({'audio': ('voice.ogg', 'audio/ogg', b'OggS' * 16)})
+
+    def test_part_too_large(self):
+        response = self._post(_encode([_file('audio', 'voice.ogg', b'x' * 2048)]))
+        expect(response.status).to.equal(falcon.HTTP_REQUEST_ENTITY_TOO_LARGE)
+
+    def test_missing_boundary(self):
+        response = self._post(_encode([_field('a', b'1')]), content_type='multipart/form-data')
+        expect(response.status).to.equal(falcon.HTTP_BAD_REQUEST)
+        expect(response.json['code']).to.equal('InvalidMultipart')
+
+    def test_undecodable_part_header(self):
+        response = self._post(_encode([({'Content-Disposition': 'form-data; name="\xff"'}, b'1')]).replace(
+            b'\xc3\xbf', b'\xff'
+        ))
+        expect(response.status).to.equal(falcon.HTTP_BAD_REQUEST)
+        expect(response.json['code']).to.equal('InvalidMultipart')
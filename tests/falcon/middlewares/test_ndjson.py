@@ -0,0 +1,115 @@
+import json
+from unittest import TestCase
+
+import falcon
+from falcon import testing
+
+from wizeline.falcon.errors.http import HTTPBadRequest
+from wizeline.falcon.middlewares.body import BodyBufferMiddleware
+from wizeline.falcon.middlewares.bodyParser import BodyParserMiddleware
+from wizeline.falcon.middlewares.json import JSONMiddleware
+from wizeline.falcon.middlewares.ndjson import encode_json_lines, iter_json_lines
+
+from sure import expect
+
+EVENTS_ROUTE = '/events'
+EVENTS = [{'id': index, 'type': 'message'} for index in range(5)]
+
+
+def _ndjson(documents):
+    return ''.join(json.dumps(document) + '\n' for document in documents)
+
+
+class EventsResource:
+    def __init__(self):
+        self.received = None
+
+    def on_post(self, req, resp):
+        self.received = []
+        for event in req.json_lines:
+            self.received.append(event)
+        resp.json = {'received': len(self.received)}
+
+    def on_get(self, req, resp):
+        resp.json_lines = iter(EVENTS)
+
+
+class JSONLinesTest(TestCase):
+    def test_lines_split_across_chunks(self):
+        body = _ndjson(EVENTS).encode()
+        chunks = [body[index:index + 5] for index in range(0, len(body), 5)]
+        expect(list(iter_json_lines(chunks))).to.equal(EVENTS)
+
+    def test_blank_lines_and_missing_trailing_newline(self):
+        expect(list(iter_json_lines([b'{"a": 1}\n\n  \n{"a": 2}']))).to.equal([{'a': 1}, {'a': 2}])
+
+    def test_documents_are_yielded_lazily(self):
+        def chunks():
+            yield b'{"a": 1}\n'
+            raise AssertionError('Second chunk should not be read')
+
+        expect(next(iter_json_lines(chunks()))).to.equal({'a': 1})
+
+    def test_invalid_line(self):
+        documents = iter_json_lines([b'{"a": 1}\n{oops}\n'])
+        expect(next(documents)).to.equal({'a': 1})
+        next.when.called_with(documents).should.throw(HTTPBadRequest)
+
+    def test_encode_groups_lines(self):
+        chunks = list(encode_json_lines(EVENTS, flush_size=40))
+        expect(len(chunks)).to.be.greater_than(1)
+        expect(b''.join(chunks).decode()).to.equal(_ndjson(EVENTS))
+
+
+class JSONLinesMiddlewareTest(testing.TestCase):
+    middleware_class = JSONMiddleware
+
+    def setUp(self):
+        self._default_headers = None
+        self.app = falcon.API(middleware=[self.middleware_class()])
+        self.events_resource = EventsResource()
+        self.app.add_route(EVENTS_ROUTE, self.events_resource)
+
+    def test_ingest(self):
+        response = self.simulate_post(
+            EVENTS_ROUTE,
+            body=_ndjson(EVENTS),
+            headers={'content-type': 'application/x-ndjson'}
+        )
+        expect(response.json).to.equal({'received': 5})
+        expect(self.events_resource.received).to.equal(EVENTS)
+
+    def test_invalid_line(self):
+        response = self.simulate_post(
+            EVENTS_ROUTE,
+            body='{"id": 1}\nnot json\n',
+            headers={'content-type': 'application/x-ndjson'}
+        )
+        expect(response.status).to.equal(falcon.HTTP_BAD_REQUEST)
+        expect(response.json['code']).to.equal('InvalidJSONLine')
+
+    def test_export(self):
+        response = self.simulate_get(EVENTS_ROUTE)
+        expect(response.headers['content-type']).to.equal('application/x-ndjson')
+        expect([json.loads(line) for line in response.text.splitlines()]).to.equal(EVENTS)
+
+
+class JSONLinesBodyParserMiddlewareTest(JSONLinesMiddlewareTest):
+    middleware_class = BodyParserMiddleware
+
+
+class JSONLinesBufferedLaterTest(testing.TestCase):
+    def setUp(self):
+        self._default_headers = None
+        self.app = falcon.API(middleware=[JSONMiddleware(), BodyBufferMiddleware()])
+        self.events_resource = EventsResource()
+        self.app.add_route(EVENTS_ROUTE, self.events_resource)
+
+    def test_ingest_body_buffered_by_later_middleware(self):
+        response = self.simulate_post(
+            EVENTS_ROUTE,
+            body=_ndjson(EVENTS),
+            headers={'content-type': 'application/x-ndjson'}
+        )
+        expect(response.json).to.equal({'received': 5})
+        expect(self.events_resource.received).to.equal(EVENTS)
@@ -0,0 +1,198 @@
+import json
+
+import falcon
+from falcon import testing
+
+from wizeline.falcon.middlewares.deadline import DeadlineMiddleware
+from wizeline.falcon.middlewares.json import JSONMiddleware
+from wizeline.falcon.middlewares.pipeline import PipelineMiddleware, build_api
+from wizeline.falcon.middlewares.secret import APISecretMiddleware
+
+from sure import expect
+
+ECHO_ROUTE = '/echo'
+PUBLIC_ROUTE = '/public'
+RAW_ROUTE = '/raw'
+
+
+class RecordingMiddleware:
+    def __init__(self, name, calls):
+        self._name = name
+        self._calls = calls
+
+    def process_request(self, req, resp):
+        self._calls.append(f'{self._name}.request')
+
+    def process_resource(self, req, resp, resource, params):
+        self._calls.append(f'{self._name}.resource')
+
+    def process_response(self, req, resp, resource, req_succeeded):
+        self._calls.append(f'{self._name}.response')
+
+    def _is_middleware_enabled(self, resource):
+        return not getattr(resource, f'disable_{self._name}', False)
+
+
+class EchoResource:
+    def on_post(self, req, resp):
+        resp.json = req.json
+
+
+class PublicResource(EchoResource):
+    is_api_secret_required = False
+
+
+class RawResource:
+    disable_json_middleware = True
+    disable_second = True
+
+    def on_post(self, req, resp):
+        resp.body = req.stream.read().decode('utf-8')
+
+
+class PipelineMiddlewareTest(testing.TestCase):
+    def setUp(self):
+        self._default_headers = None
+        self.calls = []
+        self.raw_resource = RawResource()
+        self.app = build_api(
+            [
+                RecordingMiddleware('first', self.calls),
+                APISecretMiddleware('secret'),
+                RecordingMiddleware('second', self.calls),
+                JSONMiddleware()
+            ],
+            {ECHO_ROUTE: EchoResource(), PUBLIC_ROUTE: PublicResource(), RAW_ROUTE: self.raw_resource}
+        )
+
+    def _post(self, route, **headers):
+        headers.setdefault('content-type', 'application/json')
+        return self.simulate_post(route, body=json.dumps({'hello': 'world'}), headers=headers)
+
+    def test_all_steps_enabled(self):
+        response = self._post(ECHO_ROUTE, Authorization='secret')
+        expect(response.json).to.equal({'hello': 'world'})
+        expect(self.calls).to.equal([
+            'first.request', 'second.request',
+            'first.resource', 'second.resource',
+            'second.response', 'first.response'
+        ])
+
+    def test_secret_is_still_required(self):
+        response = self._post(ECHO_ROUTE)
+        expect(response.status).to.equal(falcon.HTTP_UNAUTHORIZED)
+
+    def test_secret_step_is_skipped_for_public_resource(self):
+        response = self._post(PUBLIC_ROUTE)
+        expect(response.json).to.equal({'hello': 'world'})
+
+    def test_disabled_steps_are_skipped(self):
+        response = self._post(RAW_ROUTE, Authorization='secret')
+        expect(response.text).to.equal(json.dumps({'hello': 'world'}))
+        expect(self.calls).to.equal([
+            'first.request', 'second.request', 'first.resource', 'second.response', 'first.response'
+        ])
+
+    def test_chains_are_precomputed_for_resources(self):
+        pipeline = PipelineMiddleware(
+            [RecordingMiddleware('first', self.calls), RecordingMiddleware('second', self.calls), JSONMiddleware()],
+            [EchoResource(), self.raw_resource]
+        )
+        expect(pipeline._chains).to.have.length_of(2)
+        chain = pipeline.chain_for(self.raw_resource)
+        expect(chain.resource_steps).to.have.length_of(1)
+        expect(chain.response_steps).to.have.length_of(3)
+
+    def test_unknown_route_runs_every_response_step(self):
+        response = self.simulate_get('/missing')
+        expect(response.status).to.equal(falcon.HTTP_NOT_FOUND)
+        expect(self.calls).to.equal(['first.request', 'second.request', 'second.response', 'first.response'])
+
+    def test_resources_added_later_are_compiled_on_first_request(self):
+        pipeline = PipelineMiddleware([RecordingMiddleware('first', self.calls)])
+        app = falcon.API(middleware=[pipeline])
+        app.add_route(RAW_ROUTE, self.raw_resource)
+        testing.TestClient(app).simulate_post(RAW_ROUTE, body='x')
+        expect(pipeline._chains).to.have.length_of(1)
+
+
+class JSONResponseResource:
+    disable_json_middleware = True
+
+    def on_get(self, req, resp):
+        resp.json = {'a': 1}
+
+
+class InvalidJSONResponseResource:
+    def on_get(self, req, resp):
+        resp.json = 'str'
+
+
+class StatusRecordingMiddleware(RecordingMiddleware):
+    def process_response(self, req, resp, resource, req_succeeded):
+        self._calls.append((f'{self._name}.response', resp.status[:3], req_succeeded))
+
+
+class PipelineMatchesFalconTest(testing.TestCase):
+    def setUp(self):
+        self._default_headers = None
+
+    def _get(self, app):
+        return testing.TestClient(app).simulate_get(RAW_ROUTE)
+
+    def test_disabled_middleware_still_serializes_response(self):
+        plain = falcon.API(middleware=[JSONMiddleware()])
+        plain.add_route(RAW_ROUTE, JSONResponseResource())
+        pipelined = build_api([JSONMiddleware()], {RAW_ROUTE: JSONResponseResource()})
+
+        expected = self._get(plain)
+        response = self._get(pipelined)
+
+        expect(expected.json).to.equal({'a': 1})
+        expect(response.status).to.equal(expected.status)
+        expect(response.text).to.equal(expected.text)
+
+    def _compare(self, make_middlewares, resource, **headers):
+        results = []
+        for pipelined in (False, True):
+            calls = []
+            middlewares = make_middlewares(calls)
+            if pipelined:
+                app = build_api(middlewares, {RAW_ROUTE: resource})
+            else:
+                app = falcon.API(middleware=middlewares)
+                app.add_route(RAW_ROUTE, resource)
+            response = testing.TestClient(app).simulate_get(RAW_ROUTE, headers=headers)
+            results.append((response.status, response.json, calls))
+        expect(results[1]).to.equal(results[0])
+        return results[0]
+
+    def test_failing_response_step_does_not_skip_the_others(self):
+        status, _, calls = self._compare(
+            lambda calls: [StatusRecordingMiddleware('first', calls), JSONMiddleware()],
+            InvalidJSONResponseResource()
+        )
+
+        expect(status).to.equal(falcon.HTTP_INTERNAL_SERVER_ERROR)
+        expect(calls).to.equal(['first.request', 'first.resource', ('first.response', '500', False)])
+
+    def test_failing_request_step_still_runs_earlier_response_steps(self):
+        status, _, calls = self._compare(
+            lambda calls: [
+                StatusRecordingMiddleware('first', calls),
+                DeadlineMiddleware(),
+                StatusRecordingMiddleware('second', calls)
+            ],
+            JSONResponseResource(),
+            **{'X-Request-Timeout': 'abc'}
+        )
+
+        expect(status).to.equal(falcon.HTTP_BAD_REQUEST)
+        expect(calls).to.equal(['first.request', ('first.response', '400', False)])
+
+    def test_chains_keep_their_resource(self):
+        pipeline = PipelineMiddleware([RecordingMiddleware('first', [])])
+        resource = RawResource()
+        chain = pipeline.chain_for(resource)
+
+        expect(pipeline._chains[id(resource)]).to.equal((resource, chain))
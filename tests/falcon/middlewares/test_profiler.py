@@ -0,0 +1,93 @@
+import time
+
+import falcon
+from falcon import testing
+
+from wizeline.falcon.middlewares.profiler import CPROFILE, Profiler, ProfileResource, ProfilerMiddleware
+from wizeline.falcon.middlewares.secret import APISecretMiddleware
+
+from sure import expect
+
+BUSY_ROUTE = '/busy'
+PROFILE_ROUTE = '/profile'
+
+
+class BusyResource:
+    is_api_secret_required = False
+
+    def on_get(self, req, resp):
+        busy_handler_work()
+        resp.body = 'done'
+
+
+def busy_handler_work():
+    deadline = time.monotonic() + 0.05
+    while time.monotonic() < deadline:
+        sum(range(100))
+
+
+class ProfilerMiddlewareTest(testing.TestCase):
+    def _make_app(self, mode='sampler', sample_rate=0.0):
+        self._default_headers = None
+        self.profiler = Profiler(mode=mode, interval=0.001)
+        auth = APISecretMiddleware('secret')
+        self.app = falcon.API(middleware=[
+            ProfilerMiddleware(self.profiler, sample_rate=sample_rate, authorizer=auth),
+            auth
+        ])
+        self.app.add_route(BUSY_ROUTE, BusyResource())
+        self.app.add_route(PROFILE_ROUTE, ProfileResource(self.profiler))
+
+    def test_not_profiled_by_default(self):
+        self._make_app()
+        self.simulate_get(BUSY_ROUTE)
+        expect(self.profiler.profiled_requests).to.equal(0)
+
+    def test_header_without_valid_secret_is_ignored(self):
+        self._make_app()
+        self.simulate_get(BUSY_ROUTE, headers={'X-Profile': '1', 'Authorization': 'wrong'})
+        expect(self.profiler.profiled_requests).to.equal(0)
+
+    def test_sampled_stacks_are_collapsed(self):
+        self._make_app()
+        self.simulate_get(BUSY_ROUTE, headers={'X-Profile': '1', 'Authorization': 'secret'})
+        expect(self.profiler.profiled_requests).to.equal(1)
+
+        response = self.simulate_get(PROFILE_ROUTE, headers={'Authorization': 'secret'})
+        expect(response.text).to.contain(
+            'test_profiler:on_get;tests.falcon.middlewares.test_profiler:busy_handler_work'
+        )
+        for line in response.text.splitlines():
+            stack, count = line.rsplit(' ', 1)
+            expect(int(count)).to.be.greater_than(0)
+
+    def test_sample_rate(self):
+        self._make_app(sample_rate=1.0)
+        self.simulate_get(BUSY_ROUTE)
+        self.simulate_get(BUSY_ROUTE)
+        expect(self.profiler.profiled_requests).to.equal(2)
+
+    def test_cprofile_report_and_reset(self):
+        self._make_app(mode=CPROFILE)
+        self.simulate_get(BUSY_ROUTE, headers={'X-Profile': '1', 'Authorization': 'secret'})
+
+        response = self.simulate_get(PROFILE_ROUTE, headers={'Authorization': 'secret'})
+        expect(response.text).to.contain('busy_handler_work')
+
+        self.simulate_delete(PROFILE_ROUTE, headers={'Authorization': 'secret'})
+        expect(self.profiler.profiled_requests).to.equal(0)
+        expect(self.profiler.report()).to.equal('')
+
+    def test_cprofile_report_sort(self):
+        self._make_app(mode=CPROFILE)
+        self.simulate_get(BUSY_ROUTE, headers={'X-Profile': '1', 'Authorization': 'secret'})
+
+        response = self.simulate_get(PROFILE_ROUTE, query_string='sort=tottime', headers={'Authorization': 'secret'})
+        expect(response.text).to.contain('internal time')
+
+        response = self.simulate_get(PROFILE_ROUTE, query_string='sort=bogus', headers={'Authorization': 'secret'})
+        expect(response.status).to.equal(falcon.HTTP_BAD_REQUEST)
+        expect(response.json['code']).to.equal('InvalidSort')
+
+    def test_invalid_mode(self):
+        Profiler.when.called_with(mode='perf').should.throw(ValueError)
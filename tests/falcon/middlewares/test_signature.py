@@ -0,0 +1,123 @@
+import hashlib
+import hmac
+import json
+
+import falcon
+from falcon import testing
+
+from wizeline.falcon.middlewares.json import JSONMiddleware
+from wizeline.falcon.middlewares.signature import HMACSignatureMiddleware
+
+from sure import expect
+
+WEBHOOK_ROUTE = '/webhook'
+PUBLIC_ROUTE = '/public'
+PAYLOAD = json.dumps({'hello': 'world'})
+
+
+def _sign(key, body):
+    return 'sha256=' + hmac.new(key.encode('utf-8'), body.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+class WebhookResource:
+    def on_post(self, req, resp):
+        resp.json = req.json
+
+
+class PublicResource(WebhookResource):
+    is_signature_required = False
+
+
+class HMACSignatureMiddlewareTest(testing.TestCase):
+    def setUp(self):
+        self._default_headers = None
+        self.app = falcon.API(middleware=[
+            HMACSignatureMiddleware({'acme': 'acme-key', 'globex': 'globex-key'}),
+            JSONMiddleware()
+        ])
+        self.app.add_route(WEBHOOK_ROUTE, WebhookResource())
+        self.app.add_route(PUBLIC_ROUTE, PublicResource())
+
+    def _post(self, route, tenant, signature, body=PAYLOAD):
+        headers = {'content-type': 'application/json', 'X-Tenant-Id': tenant}
+        if signature is not None:
+            headers['X-Signature'] = signature
+        return self.simulate_post(route, body=body, headers=headers)
+
+    def test_valid_signature_shares_body_with_json_middleware(self):
+        response = self._post(WEBHOOK_ROUTE, 'acme', _sign('acme-key', PAYLOAD))
+        expect(response.status).to.equal(falcon.HTTP_OK)
+        expect(response.json).to.equal({'hello': 'world'})
+
+    def test_signature_of_another_tenant(self):
+        response = self._post(WEBHOOK_ROUTE, 'globex', _sign('acme-key', PAYLOAD))
+        expect(response.status).to.equal(falcon.HTTP_UNAUTHORIZED)
+        expect(response.json['code']).to.equal('InvalidSignature')
+
+    def test_tampered_body(self):
+        response = self._post(WEBHOOK_ROUTE, 'acme', _sign('acme-key', PAYLOAD), body='{"hello": "mars"}')
+        expect(response.status).to.equal(falcon.HTTP_UNAUTHORIZED)
+
+    def test_non_ascii_signature(self):
+        response = self._post(WEBHOOK_ROUTE, 'acme', 'sha256=\u00e9\u00e9')
+        expect(response.status).to.equal(falcon.HTTP_UNAUTHORIZED)
+        expect(response.json['code']).to.equal('InvalidSignature')
+
+    def test_missing_signature(self):
+        response = self._post(WEBHOOK_ROUTE, 'acme', None)
+        expect(response.status).to.equal(falcon.HTTP_UNAUTHORIZED)
+        expect(response.json['code']).to.equal('MissingSignature')
+
+    def test_unknown_tenant(self):
+        response = self._post(WEBHOOK_ROUTE, 'initech', _sign('acme-key', PAYLOAD))
+        expect(response.status).to.equal(falcon.HTTP_UNAUTHORIZED)
+        expect(response.json['code']).to.equal('UnknownTenant')
+
+    def test_signature_not_required(self):
+        response = self._post(PUBLIC_ROUTE, 'acme', None)
+        expect(response.status).to.equal(falcon.HTTP_OK)
+        expect(response.json).to.equal({'hello': 'world'})
+
+
+class HMACSignatureAfterJSONMiddlewareTest(testing.TestCase):
+    def setUp(self):
+        self._default_headers = None
+        self.app = falcon.API(middleware=[
+            JSONMiddleware(),
+            HMACSignatureMiddleware('shared-key', max_cached_keys=1)
+        ])
+        self.app.add_route(WEBHOOK_ROUTE, WebhookResource())
+
+    def test_signature_over_already_read_body(self):
+        response = self.simulate_post(WEBHOOK_ROUTE, body=PAYLOAD, headers={
+            'content-type': 'application/json',
+            'X-Signature': _sign('shared-key', PAYLOAD)
+        })
+        expect(response.status).to.equal(falcon.HTTP_OK)
+        expect(response.json).to.equal({'hello': 'world'})
+
+
+class HMACSignatureKeyCacheTest(testing.TestCase):
+    def setUp(self):
+        self._default_headers = None
+        self.loaded = []
+        self.app = falcon.API(middleware=[
+            HMACSignatureMiddleware(self._load_key, max_cached_keys=2),
+            JSONMiddleware()
+        ])
+        self.app.add_route(WEBHOOK_ROUTE, WebhookResource())
+
+    def _load_key(self, tenant):
+        self.loaded.append(tenant)
+        return f'{tenant}-key'
+
+    def test_busy_tenants_stay_cached(self):
+        for tenant in ('acme', 'globex', 'acme', 'initech', 'acme'):
+            response = self.simulate_post(WEBHOOK_ROUTE, body=PAYLOAD, headers={
+                'content-type': 'application/json',
+                'X-Tenant-Id': tenant,
+                'X-Signature': _sign(f'{tenant}-key', PAYLOAD)
+            })
+            expect(response.status).to.equal(falcon.HTTP_OK)
+
+        expect(self.loaded).to.equal(['acme', 'globex', 'initech'])
@@ -0,0 +1,162 @@
+import time
+
+import falcon
+from falcon import testing
+from sure import expect
+
+from wizeline.falcon.middlewares.secret import APISecretMiddleware, require_secret
+from wizeline.falcon.middlewares.tenants import TenantMiddleware, TenantRegistry, get_tenant, hash_secret
+
+TEST_ROUTE = '/test'
+
+ACME = {'id': 'acme'}
+
+
+class TenantResource:
+    def on_get(self, req, resp):
+        resp.body = get_tenant(req)['id']
+
+
+class PublicResource:
+    is_api_secret_required = False
+
+    def on_get(self, req, resp):
+        resp.body = 'Hello'
+
+
+class TenantRegistryTest(testing.TestCase):
+    def test_lookup_by_secret(self):
+        registry = TenantRegistry({'acme-secret': ACME})
+
+        expect(registry.lookup('acme-secret')).to.equal(ACME)
+        expect(registry.lookup('other-secret')).to.be.none
+        expect(registry.lookup(None)).to.be.none
+
+    def test_unknown_secrets_are_not_loaded_twice(self):
+        calls = []
+
+        def loader(digest):
+            calls.append(digest)
+            return ACME if digest == hash_secret('acme-secret') else None
+
+        registry = TenantRegistry(loader=loader)
+
+        expect(registry.lookup('bad-secret')).to.be.none
+        expect(registry.lookup('bad-secret')).to.be.none
+        expect(registry.lookup('acme-secret')).to.equal(ACME)
+        expect(registry.lookup('acme-secret')).to.equal(ACME)
+        expect(calls).to.equal([hash_secret('bad-secret'), hash_secret('acme-secret')])
+
+    def test_rejected_secrets_are_retried_after_ttl(self):
+        tenants = {}
+        registry = TenantRegistry(loader=tenants.get, rejected_ttl=0.05)
+
+        expect(registry.lookup('acme-secret')).to.be.none
+        tenants[hash_secret('acme-secret')] = ACME
+        expect(registry.lookup('acme-secret')).to.be.none
+
+        time.sleep(0.06)
+        expect(registry.lookup('acme-secret')).to.equal(ACME)
+
+    def test_negative_cache_is_bounded(self):
+        calls = []
+        registry = TenantRegistry(loader=calls.append, max_rejected=2)
+
+        for secret in ('first', 'second', 'third', 'first'):
+            registry.lookup(secret)
+
+        expect(len(calls)).to.equal(4)
+
+    def test_added_tenant_is_no_longer_rejected(self):
+        registry = TenantRegistry()
+        registry.lookup('acme-secret')
+
+        registry.add('acme-secret', ACME)
+
+        expect(registry.lookup('acme-secret')).to.equal(ACME)
+        expect(registry.remove('acme-secret')).to.equal(ACME)
+        expect(registry.lookup('acme-secret')).to.be.none
+
+
+class TenantMiddlewareTest(testing.TestCase):
+    def setUp(self):
+        self._default_headers = None
+        self.app = falcon.API(middleware=[TenantMiddleware(TenantRegistry({'acme-secret': ACME}))])
+        self.app.add_route(TEST_ROUTE, TenantResource())
+        self.app.add_route('/public', PublicResource())
+
+    def test_attaches_tenant(self):
+        response = self.simulate_get(TEST_ROUTE, headers={'Authorization': 'acme-secret'})
+
+        expect(response.status).to.equal(falcon.HTTP_OK)
+        expect(response.text).to.equal('acme')
+
+    def test_rejects_unknown_secret(self):
+        response = self.simulate_get(TEST_ROUTE, headers={'Authorization': 'bad-secret'})
+
+        expect(response.status).to.equal(falcon.HTTP_UNAUTHORIZED)
+        expect(response.json['code']).to.equal('UnknownTenant')
+
+    def test_skips_public_resources(self):
+        response = self.simulate_get('/public')
+
+        expect(response.status).to.equal(falcon.HTTP_OK)
+
+
+REGISTRY = TenantRegistry({'acme-secret': ACME})
+
+
+@falcon.before(require_secret, REGISTRY)
+class HookedTenantResource(TenantResource):
+    pass
+
+
+@falcon.before(require_secret)
+class HookedResource:
+    def on_get(self, req, resp):
+        resp.body = 'Hello'
+
+
+class RequireSecretStandaloneTest(testing.TestCase):
+    def setUp(self):
+        self._default_headers = None
+        self.app = falcon.API()
+        self.app.add_route(TEST_ROUTE, HookedTenantResource())
+        self.app.add_route('/hooked', HookedResource())
+
+    def test_looks_up_tenant_in_registry(self):
+        response = self.simulate_get(TEST_ROUTE, headers={'Authorization': 'acme-secret'})
+
+        expect(response.status).to.equal(falcon.HTTP_OK)
+        expect(response.text).to.equal('acme')
+
+    def test_rejects_unknown_secret(self):
+        response = self.simulate_get(TEST_ROUTE, headers={'Authorization': 'bad-secret'})
+
+        expect(response.status).to.equal(falcon.HTTP_UNAUTHORIZED)
+
+    def test_rejects_without_secret_middleware(self):
+        response = self.simulate_get('/hooked', headers={'Authorization': 'anything'})
+
+        expect(response.status).to.equal(falcon.HTTP_UNAUTHORIZED)
+
+
+class RequireSecretWithMiddlewaresTest(testing.TestCase):
+    def setUp(self):
+        self._default_headers = None
+
+    def test_accepts_tenant_from_middleware(self):
+        self.app = falcon.API(middleware=[TenantMiddleware(TenantRegistry({'acme-secret': ACME}))])
+        self.app.add_route(TEST_ROUTE, HookedResource())
+
+        response = self.simulate_get(TEST_ROUTE, headers={'Authorization': 'acme-secret'})
+
+        expect(response.status).to.equal(falcon.HTTP_OK)
+
+    def test_accepts_api_secret(self):
+        self.app = falcon.API(middleware=[APISecretMiddleware('secret', required=False)])
+        self.app.add_route(TEST_ROUTE, HookedResource())
+
+        response = self.simulate_get(TEST_ROUTE, headers={'Authorization': 'secret'})
+
+        expect(response.status).to.equal(falcon.HTTP_OK)
@@ -0,0 +1,194 @@
+import json
+import os
+import socket
+import tempfile
+import time
+from unittest import TestCase
+
+import falcon
+from falcon import testing
+
+from wizeline.falcon.middlewares.bodyParser import BodyParserMiddleware
+from wizeline.falcon.middlewares.json import JSONMiddleware
+from wizeline.falcon.middlewares.secret import APISecretMiddleware
+from wizeline.falcon.middlewares.tracing import (
+    CollectorExporter,
+    FileExporter,
+    InMemoryExporter,
+    Span,
+    Tracer,
+    TracingMiddleware,
+    format_traceparent,
+    get_span,
+    parse_traceparent
+)
+
+from sure import expect
+
+ECHO_ROUTE = '/echo'
+TRACE_ID = '4bf92f3577b34da6a3ce929d0e0e4736'
+PARENT_ID = '00f067aa0ba902b7'
+
+
+class EchoResource:
+    def __init__(self):
+        self.outgoing_traceparent = None
+
+    def on_post(self, req, resp):
+        self.outgoing_traceparent = format_traceparent(get_span(req))
+        resp.json = req.json
+
+
+class FailingOnceExporter(InMemoryExporter):
+    def __init__(self):
+        super(FailingOnceExporter, self).__init__()
+        self.failed = False
+
+    def export(self, spans):
+        if not self.failed:
+            self.failed = True
+            raise OSError('disk full')
+        super(FailingOnceExporter, self).export(spans)
+
+
+class TraceparentTest(TestCase):
+    def test_parse(self):
+        expect(parse_traceparent(f'00-{TRACE_ID}-{PARENT_ID}-01')).to.equal((TRACE_ID, PARENT_ID, True))
+        expect(parse_traceparent(f'00-{TRACE_ID}-{PARENT_ID}-00')).to.equal((TRACE_ID, PARENT_ID, False))
+
+    def test_invalid(self):
+        expect(parse_traceparent(None)).to.be.none
+        expect(parse_traceparent('garbage')).to.be.none
+        expect(parse_traceparent(f'00-{"0" * 32}-{PARENT_ID}-01')).to.be.none
+        expect(parse_traceparent(f'ff-{TRACE_ID}-{PARENT_ID}-01')).to.be.none
+
+    def test_format(self):
+        span = Span('test', TRACE_ID)
+        expect(format_traceparent(span)).to.equal(f'00-{TRACE_ID}-{span.span_id}-01')
+
+
+class TracerTest(TestCase):
+    def test_ring_buffer_drops_oldest(self):
+        exporter = InMemoryExporter()
+        tracer = Tracer(exporter, buffer_size=2, flush_interval=60)
+        for name in ('a', 'b', 'c'):
+            tracer.finish(tracer.start_span(name))
+        tracer.flush()
+        expect([span.name for span in exporter.spans]).to.equal(['b', 'c'])
+        expect(tracer.dropped).to.equal(1)
+        tracer.shutdown()
+
+    def test_background_export(self):
+        exporter = InMemoryExporter()
+        tracer = Tracer(exporter, flush_interval=0.01)
+        tracer.finish(tracer.start_span('a'))
+        tracer.shutdown()
+        expect([span.name for span in exporter.spans]).to.equal(['a'])
+
+    def test_export_errors_do_not_stop_the_worker(self):
+        exporter = FailingOnceExporter()
+        tracer = Tracer(exporter, flush_interval=0.01)
+        tracer.finish(tracer.start_span('a'))
+        for _ in range(100):
+            if tracer.export_errors:
+                break
+            time.sleep(0.01)
+        tracer.finish(tracer.start_span('b'))
+        tracer.shutdown()
+
+        expect(tracer.export_errors).to.equal(1)
+        expect([span.name for span in exporter.spans]).to.equal(['b'])
+
+    def test_unsampled_spans_are_not_exported(self):
+        exporter = InMemoryExporter()
+        tracer = Tracer(exporter, sample_rate=0.0)
+        tracer.finish(tracer.start_span('a'))
+        tracer.flush()
+        expect(exporter.spans).to.be.empty
+
+    def test_file_exporter(self):
+        descriptor, path = tempfile.mkstemp()
+        os.close(descriptor)
+        try:
+            FileExporter(path).export([Span('a', TRACE_ID), Span('b', TRACE_ID)])
+            with open(path) as file:
+                expect([json.loads(line)['name'] for line in file]).to.equal(['a', 'b'])
+        finally:
+            os.remove(path)
+
+    def test_collector_exporter(self):
+        collector = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        collector.bind(('127.0.0.1', 0))
+        collector.settimeout(1)
+        exporter = CollectorExporter(port=collector.getsockname()[1], max_datagram_size=400)
+        try:
+            exporter.export([Span(name, TRACE_ID) for name in ('a', 'b', 'c')])
+            names = []
+            while len(names) < 3:
+                names.extend(span['name'] for span in json.loads(collector.recv(65536).decode('utf-8')))
+            expect(names).to.equal(['a', 'b', 'c'])
+        finally:
+            exporter.close()
+            collector.close()
+
+
+class TracingMiddlewareTest(testing.TestCase):
+    def setUp(self):
+        self._default_headers = None
+        self.exporter = InMemoryExporter()
+        self.tracer = Tracer(self.exporter, flush_interval=60)
+        self.app = falcon.API(middleware=[
+            TracingMiddleware(self.tracer),
+            self.tracer.instrument(APISecretMiddleware('secret')),
+            self.tracer.instrument(BodyParserMiddleware()),
+            self.tracer.instrument(JSONMiddleware())
+        ])
+        self.echo_resource = EchoResource()
+        self.app.add_route(ECHO_ROUTE, self.echo_resource)
+
+    def tearDown(self):
+        self.tracer.shutdown()
+
+    def _post(self, **headers):
+        headers.setdefault('content-type', 'application/json')
+        return self.simulate_post(ECHO_ROUTE, body='{"hello": "world"}', headers=headers)
+
+    def test_spans_for_each_middleware_phase(self):
+        response = self._post(Authorization='secret', traceparent=f'00-{TRACE_ID}-{PARENT_ID}-01')
+        expect(response.json).to.equal({'hello': 'world'})
+        self.tracer.flush()
+
+        spans = {span.name: span for span in self.exporter.spans}
+        expect(set(spans)).to.equal({
+            'http.request',
+            'APISecretMiddleware.process_resource',
+            'BodyParserMiddleware.process_resource',
+            'BodyParserMiddleware.process_response',
+            'JSONMiddleware.process_resource',
+            'JSONMiddleware.process_response',
+        })
+        root = spans['http.request']
+        expect(root.trace_id).to.equal(TRACE_ID)
+        expect(root.parent_id).to.equal(PARENT_ID)
+        expect(root.attributes['http.status_code']).to.equal(200)
+        for name, span in spans.items():
+            if name != 'http.request':
+                expect(span.parent_id).to.equal(root.span_id)
+
+        expect(response.headers['traceparent']).to.equal(f'00-{TRACE_ID}-{root.span_id}-01')
+        expect(self.echo_resource.outgoing_traceparent).to.equal(response.headers['traceparent'])
+
+    def test_rejection_is_recorded(self):
+        response = self._post()
+        expect(response.status).to.equal(falcon.HTTP_UNAUTHORIZED)
+        self.tracer.flush()
+
+        spans = {span.name: span for span in self.exporter.spans}
+        expect(spans['APISecretMiddleware.process_resource'].error).to.contain('401')
+        expect(spans['http.request'].error).to.contain('401')
+
+    def test_new_trace_without_header(self):
+        response = self._post(Authorization='secret')
+        traceparent = parse_traceparent(response.headers['traceparent'])
+        expect(traceparent).to_not.be.none
+        expect(traceparent[0]).to_not.equal(TRACE_ID)
@@ -0,0 +1,33 @@
+import importlib
+import sys
+import types
+
+
+class _LazyModule(types.ModuleType):
+    def __getattr__(self, name):
+        module_name = self._lazy_exports.get(name)
+        if module_name is None:
+            raise AttributeError(f'module {self.__name__!r} has no attribute {name!r}')
+
+        value = getattr(importlib.import_module(module_name), name)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(super(_LazyModule, self).__dir__()) | set(self._lazy_exports))
+
+
+def lazy_exports(module_name, exports):
+    """Expose `exports` ({attribute: submodule}) of a package on first access.
+
+    Importing the package then costs nothing beyond the package itself;
+    each submodule, and whatever it imports, is loaded the first time one
+    of its attributes is used.
+    """
+    module = sys.modules[module_name]
+    module._lazy_exports = {
+        name: f'{module_name}.{submodule}'
+        for name, submodule in exports.items()
+    }
+    module.__all__ = sorted(exports)
+    module.__class__ = _LazyModule
@@ -0,0 +1,19 @@
+from wizeline._lazy import lazy_exports
+
+lazy_exports(__name__, {
+    name: 'http' for name in (
+        'HTTPError',
+        'HTTPBadRequest',
+        'HTTPUnauthorized',
+        'HTTPForbidden',
+        'HTTPNotFound',
+        'HTTPMethodNotAllowed',
+        'HTTPNotAcceptable',
+        'HTTPRequestTimeout',
+        'HTTPConflict',
+        'HTTPInternalServerError',
+        'HTTPBadGateway',
+        'HTTPServiceUnavailable',
+        'HTTPGatewayTimeout',
+    )
+})
@@ -130,6 +130,16 @@ class HTTPNotAcceptable(HTTPError):
         )
 
 
+class HTTPRequestTimeout(HTTPError):
+    def __init__(self, code=None, message=None, **kwargs):
+        super(HTTPRequestTimeout, self).__init__(
+            status.HTTP_408,
+            code,
+            message,
+            **kwargs
+        )
+
+
 class HTTPConflict(HTTPError):
     def __init__(self, code=None, message=None, **kwargs):
         super(HTTPConflict, self).__init__(
@@ -175,3 +185,13 @@ class HTTPServiceUnavailable(HTTPError):
             message,
             **kwargs
         )
+
+
+class HTTPGatewayTimeout(HTTPError):
+    def __init__(self, code=None, message=None, **kwargs):
+        super(HTTPGatewayTimeout, self).__init__(
+            status.HTTP_504,
+            code,
+            message,
+            **kwargs
+        )
@@ -1,5 +1,35 @@
 # flake8: noqa
 __version__ = '1.0.0'
 
-from wizeline.falcon.middlewares.secret import APISecretMiddleware, require_secret
-from wizeline.falcon.middlewares.json import JSONMiddleware
+from wizeline._lazy import lazy_exports
+
+lazy_exports(__name__, {
+    'APISecretMiddleware': 'secret',
+    'require_secret': 'secret',
+    'TenantMiddleware': 'tenants',
+    'TenantRegistry': 'tenants',
+    'get_tenant': 'tenants',
+    'JSONMiddleware': 'json',
+    'BodyParserMiddleware': 'bodyParser',
+    'Batcher': 'batching',
+    'get_batch_result': 'batching',
+    'DeadlineMiddleware': 'deadline',
+    'check_deadline': 'deadline',
+    'get_deadline': 'deadline',
+    'remaining_time': 'deadline',
+    'HMACSignatureMiddleware': 'signature',
+    'BodyBufferMiddleware': 'body',
+    'RequestBody': 'body',
+    'get_body': 'body',
+    'AccessLogMiddleware': 'access_log',
+    'create_queue_logger': 'access_log',
+    'MetricsRegistry': 'metrics',
+    'MetricsResource': 'metrics',
+    'Profiler': 'profiler',
+    'ProfileResource': 'profiler',
+    'ProfilerMiddleware': 'profiler',
+    'Tracer': 'tracing',
+    'TracingMiddleware': 'tracing',
+    'PipelineMiddleware': 'pipeline',
+    'build_api': 'pipeline',
+})
@@ -0,0 +1,172 @@
+import json
+import logging
+import queue
+import random
+import re
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+from wizeline.falcon.middlewares.body import BODY_CONTEXT_KEY
+
+ACCESS_LOG_CONTEXT_KEY = 'access_log'
+REDACTED = '[REDACTED]'
+DEFAULT_HEADERS = ('user-agent', 'content-type', 'authorization')
+SENSITIVE_HEADERS = ('authorization', 'cookie', 'proxy-authorization', 'x-signature')
+SENSITIVE_FIELDS = ('password', 'secret', 'token', 'api_key')
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks the request thread.
+
+    Records are dropped (and counted) when the queue is full instead of
+    waiting for the listener thread to catch up.
+    """
+
+    def __init__(self, log_queue):
+        super(DroppingQueueHandler, self).__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        return record
+
+
+def create_queue_logger(name, handlers, queue_size=10000):
+    """Return a logger writing through a bounded queue and its listener.
+
+    The caller owns the listener and must start() it, and stop() it on
+    shutdown to flush pending records to `handlers`.
+    """
+    log_queue = queue.Queue(queue_size)
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(DroppingQueueHandler(log_queue))
+    return logger, QueueListener(log_queue, *handlers, respect_handler_level=True)
+
+
+def _compile_redactions(fields):
+    """Patterns hiding the values of `fields` in JSON and urlencoded bodies.
+
+    JSON strings, numbers and literals are replaced, as well as strings
+    left open at the end of the text; in forms the value of `name=` and of
+    bracketed names such as `name[0]=` is replaced up to the next `&`.
+    """
+    names = '|'.join(re.escape(field) for field in fields)
+    return (
+        (
+            re.compile(r'("(?:%s)"\s*:\s*)(?:"(?:[^"\\]|\\.)*(?:"|\\?\Z)|[^\s,:{}\[\]"]+)' % names, re.IGNORECASE),
+            r'\1"%s"' % REDACTED
+        ),
+        (
+            re.compile(r'((?:^|&)(?:%s)(?:\[[^=&]*\]|%%5B[^=&]*%%5D)?=)[^&]*' % names, re.IGNORECASE),
+            r'\1%s' % REDACTED
+        ),
+    )
+
+
+class AccessLogMiddleware:
+    def __init__(
+            self,
+            logger=None,
+            sample_rate=1.0,
+            always_log_errors=True,
+            headers=DEFAULT_HEADERS,
+            log_payload=False,
+            max_payload_size=256,
+            sensitive_headers=SENSITIVE_HEADERS,
+            sensitive_fields=SENSITIVE_FIELDS
+    ):
+        self._logger = logger or logging.getLogger('wizeline.access')
+        self._sample_rate = sample_rate
+        self._always_log_errors = always_log_errors
+        self._headers = tuple(header.lower() for header in headers)
+        self._log_payload = log_payload
+        self._max_payload_size = max_payload_size
+        self._sensitive_headers = frozenset(header.lower() for header in sensitive_headers)
+        self._redactions = _compile_redactions(sensitive_fields) if sensitive_fields else ()
+
+    def process_request(self, req, resp):
+        sampled = self._sample_rate >= 1.0 or random.random() < self._sample_rate
+        req.context[ACCESS_LOG_CONTEXT_KEY] = [time.monotonic(), None, sampled]
+
+    def process_resource(self, req, resp, resource, params):
+        timings = req.context.get(ACCESS_LOG_CONTEXT_KEY)
+        if timings is not None:
+            timings[1] = time.monotonic()
+
+    def process_response(self, req, resp, resource, req_succeeded):
+        timings = req.context.get(ACCESS_LOG_CONTEXT_KEY)
+        if timings is None:
+            return
+
+        started_at, routed_at, sampled = timings
+        if not sampled and not (self._always_log_errors and self._is_error(resp)):
+            return
+
+        finished_at = time.monotonic()
+        record = self._build_record(req, resp, resource, started_at, routed_at, finished_at)
+        self._logger.info(json.dumps(record), extra={'access': record})
+
+    def _is_error(self, resp):
+        return resp.status[:1] == '5'
+
+    def _build_record(self, req, resp, resource, started_at, routed_at, finished_at):
+        record = {
+            'method': req.method,
+            'path': req.path,
+            'route': getattr(req, 'uri_template', None),
+            'resource': type(resource).__name__ if resource is not None else None,
+            'status': int(resp.status[:3]),
+            'request_size': req.content_length or 0,
+            'response_size': self._get_response_size(resp),
+            'duration_ms': round((finished_at - started_at) * 1000, 3),
+            'phases_ms': {
+                'routing': self._elapsed_ms(started_at, routed_at),
+                'processing': self._elapsed_ms(routed_at, finished_at),
+            },
+            'headers': self._get_headers(req),
+        }
+        if self._log_payload:
+            record['payload'] = self._get_payload(req)
+        return record
+
+    def _elapsed_ms(self, start, end):
+        if start is None or end is None:
+            return None
+        return round((end - start) * 1000, 3)
+
+    def _get_response_size(self, resp):
+        content = resp.body if resp.body is not None else resp.data
+        if content is None:
+            return None
+        return len(content)
+
+    def _get_headers(self, req):
+        headers = {}
+        for name in self._headers:
+            value = req.get_header(name)
+            if value is not None:
+                headers[name] = REDACTED if name in self._sensitive_headers else value
+        return headers
+
+    def _get_payload(self, req):
+        body = req.context.get(BODY_CONTEXT_KEY)
+        if body is None:
+            return None
+
+        # Values cut open at the end of the window are redacted too, and
+        # the result is truncated again only once redaction is done.
+        snippet = body.view()[:self._max_payload_size].tobytes().decode('utf-8', errors='replace')
+        if self._redactions:
+            for pattern, replacement in self._redactions:
+                snippet = pattern.sub(replacement, snippet)
+            snippet = snippet[:self._max_payload_size]
+        if len(body) > self._max_payload_size:
+            snippet += f'... ({len(body)} bytes)'
+        return snippet
@@ -0,0 +1,130 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+from wizeline.falcon.errors.http import HTTPGatewayTimeout, HTTPInternalServerError
+from wizeline.falcon.middlewares.deadline import remaining_time
+
+BATCHER_CONTEXT_KEY = 'batcher'
+BATCH_RESULT_CONTEXT_KEY = 'batch_result'
+
+
+class Batcher:
+    """Groups items submitted by concurrent requests into batches.
+
+    `handler` takes a list of items and returns a list with one result per
+    item, in the same order. A worker thread starts a batch with the first
+    waiting item and closes it once `max_batch_size` items were collected
+    or `max_wait` seconds passed, so each item waits at most `max_wait`
+    seconds before its batch is handed to `handler`.
+    """
+
+    def __init__(self, handler, max_batch_size=32, max_wait=0.005):
+        self._handler = handler
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._pid = None
+
+    def submit(self, item):
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((item, future))
+        return future
+
+    def _ensure_worker(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+
+        with self._lock:
+            if self._pid != pid:
+                self._queue = queue.Queue()
+                self._worker = threading.Thread(target=self._run, args=(self._queue,),
+                                                name='wizeline-batcher', daemon=True)
+                self._worker.start()
+                self._pid = pid
+
+    def _run(self, pending):
+        while True:
+            batch = [pending.get()]
+            if batch[0] is None:
+                return
+
+            closes_at = time.monotonic() + self._max_wait
+            while len(batch) < self._max_batch_size:
+                timeout = closes_at - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    entry = pending.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if entry is None:
+                    pending.put(None)
+                    break
+                batch.append(entry)
+            self._process(batch)
+
+    def _process(self, batch):
+        batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        items, futures = zip(*batch)
+        try:
+            results = self._handler(list(items))
+            if len(results) != len(items):
+                raise RuntimeError(f'The batch handler returned {len(results)} results for {len(items)} items')
+        except Exception as error:
+            for future in futures:
+                future.set_exception(error)
+            return
+
+        for future, result in zip(futures, results):
+            future.set_result(result)
+
+    def shutdown(self):
+        with self._lock:
+            if self._worker is not None and self._pid == os.getpid():
+                self._queue.put(None)
+                self._worker.join()
+            self._worker = None
+            self._pid = None
+
+
+def get_batch_result(req, timeout=None):
+    """Submit `req.json` to the resource's batcher and wait for its result.
+
+    The payload is only submitted here, once every middleware has
+    accepted the request, so rejected requests never take batch capacity.
+    Later calls wait on the same submission, unless it was cancelled by a
+    timeout before the batch picked it up. Waits for at most `timeout` seconds, or what is left of the request
+    deadline, and raises a 504 if the batch did not finish in time.
+    """
+    batcher = req.context.get(BATCHER_CONTEXT_KEY)
+    if batcher is None:
+        raise HTTPInternalServerError(
+            code='NotBatched',
+            message='The request payload was not parsed for batching'
+        )
+
+    future = req.context.get(BATCH_RESULT_CONTEXT_KEY)
+    if future is None or future.cancelled():
+        future = req.context[BATCH_RESULT_CONTEXT_KEY] = batcher.submit(req.json)
+    remaining = remaining_time(req)
+    if remaining is not None and (timeout is None or remaining < timeout):
+        timeout = remaining
+
+    try:
+        return future.result(timeout)
+    except TimeoutError:
+        future.cancel()
+        raise HTTPGatewayTimeout(
+            code='BatchTimeout',
+            message='The batched request did not finish in time'
+        )
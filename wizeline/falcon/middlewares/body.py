@@ -0,0 +1,175 @@
+import io
+import mmap
+import tempfile
+
+from falcon import HTTPRequestEntityTooLarge
+
+from wizeline.falcon.middlewares.deadline import check_read_deadline, get_deadline
+
+BODY_CONTEXT_KEY = 'body'
+STREAMED_CONTEXT_KEY = 'body_streamed'
+CHUNK_SIZE = 64 * 1024
+SPILL_THRESHOLD = 1024 * 1024
+
+
+class RequestBody:
+    """Request body read once and shared by every middleware and handler.
+
+    Small bodies are kept in a bytearray, bodies above `spill_threshold`
+    are moved to an anonymous temporary file and mapped in memory, so in
+    both cases `view()` hands out a memoryview without copying.
+    """
+
+    def __init__(self, spill_threshold=SPILL_THRESHOLD):
+        self._spill_threshold = spill_threshold
+        self._buffer = bytearray()
+        self._file = None
+        self._mmap = None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def spilled(self):
+        return self._file is not None or self._mmap is not None
+
+    def write(self, chunk):
+        self._size += len(chunk)
+        if self._file is not None:
+            self._file.write(chunk)
+            return
+
+        self._buffer += chunk
+        if self._size > self._spill_threshold:
+            self._spill()
+
+    def _spill(self):
+        self._file = tempfile.TemporaryFile()
+        self._file.write(self._buffer)
+        self._buffer = bytearray()
+
+    def finish(self):
+        if self._file is not None:
+            self._file.flush()
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._file.close()
+            self._file = None
+
+    def view(self):
+        if self._mmap is not None:
+            return memoryview(self._mmap)
+        return memoryview(self._buffer)
+
+    def tobytes(self):
+        return self.view().tobytes()
+
+    def decode(self, encoding='utf-8'):
+        return str(self.view(), encoding)
+
+    def open(self):
+        return io.BufferedReader(_ViewReader(self.view()))
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._buffer = bytearray()
+        self._size = 0
+
+
+class _ViewReader(io.RawIOBase):
+    def __init__(self, view):
+        self._view = view
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        remaining = len(self._view) - self._position
+        size = min(len(target), remaining)
+        target[:size] = self._view[self._position:self._position + size]
+        self._position += size
+        return size
+
+
+def iter_chunks(req, chunk_size=CHUNK_SIZE):
+    deadline = get_deadline(req)
+    stream = req.bounded_stream
+    while True:
+        check_read_deadline(deadline)
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_body(req, chunk_size=CHUNK_SIZE):
+    """Iterate the body without buffering it, unless it was already read.
+
+    The choice is made when iteration starts, so a body buffered by a
+    later middleware before the handler iterates is still seen.
+    """
+    body = req.context.get(BODY_CONTEXT_KEY)
+    if body is not None:
+        yield body.view()
+        return
+
+    req.context[STREAMED_CONTEXT_KEY] = True
+    yield from iter_chunks(req, chunk_size)
+
+
+def get_body(req, on_chunk=None, chunk_size=CHUNK_SIZE, spill_threshold=SPILL_THRESHOLD, max_size=None):
+    """Return the shared RequestBody, reading the stream on first use.
+
+    `on_chunk` is called with every piece of the body as it is read, so
+    consumers such as digests can work incrementally; when the body was
+    already read by another middleware it is called once with a view of it.
+    """
+    body = req.context.get(BODY_CONTEXT_KEY)
+    if body is not None:
+        if on_chunk is not None:
+            on_chunk(body.view())
+        return body
+
+    if req.context.get(STREAMED_CONTEXT_KEY):
+        raise RuntimeError('The request body was already streamed by iter_body and can not be buffered')
+
+    body = RequestBody(spill_threshold)
+    for chunk in iter_chunks(req, chunk_size):
+        if on_chunk is not None:
+            on_chunk(chunk)
+        body.write(chunk)
+        if max_size is not None and len(body) > max_size:
+            body.close()
+            raise HTTPRequestEntityTooLarge(
+                'Request body too large',
+                f'The request body must not exceed {max_size} bytes'
+            )
+    body.finish()
+
+    req.context[BODY_CONTEXT_KEY] = body
+    return body
+
+
+class BodyBufferMiddleware:
+    def __init__(self, spill_threshold=SPILL_THRESHOLD, max_size=None, chunk_size=CHUNK_SIZE):
+        self._spill_threshold = spill_threshold
+        self._max_size = max_size
+        self._chunk_size = chunk_size
+
+    def process_resource(self, req, resp, resource, params):
+        if self._is_middleware_enabled(resource):
+            get_body(
+                req,
+                chunk_size=self._chunk_size,
+                spill_threshold=self._spill_threshold,
+                max_size=self._max_size
+            )
+
+    def _is_middleware_enabled(self, resource):
+        return not getattr(resource, 'disable_body_buffer_middleware', False)
@@ -3,11 +3,37 @@ from json.decoder import JSONDecodeError
 
 import falcon
 
+from wizeline.falcon.errors.http import HTTPInternalServerError
+from wizeline.falcon.middlewares.body import get_body, iter_body
+from wizeline.falcon.middlewares.form import parse_form, parse_form_params
+from wizeline.falcon.middlewares.json import ERROR_DETAIL_SNIPPET, ERROR_DETAILS, describe_json_error
+from wizeline.falcon.middlewares.multipart import SPOOL_SIZE, parse_header, parse_multipart
+from wizeline.falcon.middlewares.ndjson import is_ndjson_content_type, iter_json_lines, set_json_lines_response
+
 
 class BodyParserMiddleware:
+    def __init__(
+            self,
+            max_part_size=None,
+            max_multipart_size=None,
+            spool_size=SPOOL_SIZE,
+            error_detail=ERROR_DETAIL_SNIPPET,
+            snippet_size=20
+    ):
+        if error_detail not in ERROR_DETAILS:
+            raise ValueError(f'error_detail must be one of {ERROR_DETAILS}')
+
+        self._error_detail = error_detail
+        self._snippet_size = snippet_size
+        self._max_part_size = max_part_size
+        self._max_multipart_size = max_multipart_size
+        self._spool_size = spool_size
+
     def process_resource(self, req, resp, resource, params):
         if self._is_middleware_enabled(resource) and self._request_supported_methods(req):
-            if self._is_json_content_type(req):
+            if is_ndjson_content_type(req.content_type):
+                req.json_lines = iter_json_lines(iter_body(req))
+            elif self._is_json_content_type(req):
                 try:
                     req.text = self._get_payload(req)
                     if self._is_not_empty(req.text):
@@ -15,10 +41,15 @@ class BodyParserMiddleware:
                     else:
                         req.json = {}
 
-                except JSONDecodeError:
-                    raise falcon.HTTPInternalServerError()
+                except JSONDecodeError as error:
+                    raise HTTPInternalServerError(
+                        code='InvalidJSON',
+                        message=describe_json_error(error, req.text, self._error_detail, self._snippet_size)
+                    )
             elif self._is_urlencoded_content_type(req):
-                req.json = req.params
+                req.json = self._parse_form(req, resource)
+            elif self._is_multipart_content_type(req):
+                req.json, req.files = self._parse_multipart(req)
             else:
                 raise falcon.HTTPUnsupportedMediaType()
 
@@ -38,11 +69,31 @@ class BodyParserMiddleware:
     def _is_urlencoded_content_type(self, req):
         return req.content_type and ('application/x-www-form-urlencoded' in req.content_type)
 
+    def _is_multipart_content_type(self, req):
+        return req.content_type and ('multipart/form-data' in req.content_type)
+
     def _get_payload(self, req):
-        return req.bounded_stream.read().decode('utf-8')
+        return get_body(req).decode()
+
+    def _parse_form(self, req, resource):
+        fields = getattr(resource, 'form_fields', None)
+        if req.options.auto_parse_form_urlencoded:
+            return parse_form_params(req.params, fields)
+        return parse_form(iter_body(req), fields)
+
+    def _parse_multipart(self, req):
+        return parse_multipart(
+            iter_body(req),
+            parse_header(req.content_type)[1].get('boundary'),
+            max_part_size=self._max_part_size,
+            max_size=self._max_multipart_size,
+            spool_size=self._spool_size
+        )
 
     def process_response(self, req, resp, resource, req_succeeded):
-        if not self._has_body(resp):
+        if self._has_json_lines(resp) and not self._has_body(resp):
+            set_json_lines_response(resp)
+        elif not self._has_body(resp):
             resp.body = self._serialize_json_to_string(resp)
 
     def _has_body(self, resp):
@@ -52,9 +103,15 @@ class BodyParserMiddleware:
         if self._has_json(resp):
             if not isinstance(resp.json, dict) and \
                not isinstance(resp.json, list):
-                raise falcon.HTTPInternalServerError()
+                raise HTTPInternalServerError(
+                    code='InvalidResponse',
+                    message=f'The response payload must be a dict or a list, not {type(resp.json).__name__}'
+                )
             return json.dumps(resp.json)
         return json.dumps({})
 
     def _has_json(self, resp):
         return hasattr(resp, 'json')
+
+    def _has_json_lines(self, resp):
+        return hasattr(resp, 'json_lines')
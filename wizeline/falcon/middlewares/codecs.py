@@ -0,0 +1,144 @@
+import importlib
+import json
+from importlib.util import find_spec
+
+JSON_MEDIA_TYPE = 'application/json'
+MSGPACK_MEDIA_TYPE = 'application/msgpack'
+CBOR_MEDIA_TYPE = 'application/cbor'
+
+
+class Codec:
+    __slots__ = ('media_type', 'aliases', 'loads', 'dumps')
+
+    def __init__(self, media_type, loads, dumps, aliases=()):
+        self.media_type = media_type
+        self.aliases = tuple(aliases)
+        self.loads = loads
+        self.dumps = dumps
+
+
+class CodecRegistry:
+    """Maps media types to codecs for request and response negotiation.
+
+    `loads` takes bytes and returns the decoded document, `dumps` takes a
+    document and returns bytes. The first registered codec is the default
+    used when the client accepts anything.
+    """
+
+    def __init__(self, codecs=()):
+        self._codecs = {}
+        self.default = None
+        for codec in codecs:
+            self.register(codec)
+
+    def register(self, codec):
+        for media_type in (codec.media_type,) + codec.aliases:
+            self._codecs[media_type] = codec
+        if self.default is None:
+            self.default = codec
+
+    def media_types(self):
+        return list(self._codecs)
+
+    def for_content_type(self, content_type):
+        if not content_type:
+            return None
+        return self._codecs.get(_media_type(content_type))
+
+    def for_accept(self, accept):
+        if not accept:
+            return self.default
+
+        best, best_quality = None, 0.0
+        for media_range in accept.split(','):
+            media_type, _, params = media_range.partition(';')
+            media_type = media_type.strip().lower()
+            quality = _quality(params)
+            if quality <= best_quality:
+                continue
+
+            if media_type in ('*/*', 'application/*'):
+                codec = self.default
+            else:
+                codec = self._codecs.get(media_type)
+            if codec is not None:
+                best, best_quality = codec, quality
+        return best
+
+
+def _media_type(content_type):
+    return content_type.partition(';')[0].strip().lower()
+
+
+def _quality(params):
+    for param in params.split(';'):
+        name, _, value = param.partition('=')
+        if name.strip() == 'q':
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def _json_loads(data):
+    return json.loads(data.decode('utf-8'))
+
+
+def _json_dumps(document):
+    return json.dumps(document).encode('utf-8')
+
+
+_optional_modules = {}
+
+
+def is_available(module_name):
+    """Tell whether an optional codec library is installed, without importing it."""
+    return find_spec(module_name) is not None
+
+
+def _optional_module(module_name):
+    module = _optional_modules.get(module_name)
+    if module is None:
+        module = _optional_modules[module_name] = importlib.import_module(module_name)
+    return module
+
+
+def _msgpack_loads(data):
+    return _optional_module('msgpack').unpackb(data, raw=False)
+
+
+def _msgpack_dumps(document):
+    return _optional_module('msgpack').packb(document, use_bin_type=True)
+
+
+def _cbor_loads(data):
+    return _optional_module('cbor2').loads(data)
+
+
+def _cbor_dumps(document):
+    return _optional_module('cbor2').dumps(document)
+
+
+JSON_CODEC = Codec(JSON_MEDIA_TYPE, _json_loads, _json_dumps, aliases=('text/json',))
+MSGPACK_CODEC = Codec(
+    MSGPACK_MEDIA_TYPE,
+    _msgpack_loads,
+    _msgpack_dumps,
+    aliases=('application/x-msgpack', 'application/vnd.msgpack')
+)
+CBOR_CODEC = Codec(CBOR_MEDIA_TYPE, _cbor_loads, _cbor_dumps)
+
+
+def create_default_registry():
+    """JSON plus MessagePack and CBOR when installed.
+
+    The binary codec libraries are only imported when a request or
+    response first uses them.
+    """
+    registry = CodecRegistry([JSON_CODEC])
+    if is_available('msgpack'):
+        registry.register(MSGPACK_CODEC)
+    if is_available('cbor2'):
+        registry.register(CBOR_CODEC)
+    return registry
@@ -0,0 +1,108 @@
+import math
+import time
+
+from falcon import HTTPInvalidHeader
+
+from wizeline.falcon.errors.http import HTTPGatewayTimeout, HTTPRequestTimeout
+
+DEADLINE_CONTEXT_KEY = 'deadline'
+START_CONTEXT_KEY = 'request_started_at'
+
+
+class Deadline:
+    __slots__ = ('expires_at',)
+
+    def __init__(self, expires_at):
+        self.expires_at = expires_at
+
+    @classmethod
+    def after(cls, timeout, started_at=None):
+        if started_at is None:
+            started_at = time.monotonic()
+        return cls(started_at + timeout)
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+
+def get_deadline(req):
+    return req.context.get(DEADLINE_CONTEXT_KEY)
+
+
+def remaining_time(req):
+    """Seconds left before the request deadline, or None when unbounded."""
+    deadline = get_deadline(req)
+    if deadline is None:
+        return None
+    return deadline.remaining()
+
+
+def check_deadline(req, required=0.0):
+    """Raise a 504 if less than `required` seconds remain for the request.
+
+    Handlers should call this before starting expensive downstream work
+    that is not worth doing once the caller has already given up.
+    """
+    remaining = remaining_time(req)
+    if remaining is not None and remaining <= required:
+        raise HTTPGatewayTimeout(
+            code='DeadlineExceeded',
+            message='Not enough time left to process the request'
+        )
+
+
+def check_read_deadline(deadline):
+    if deadline is not None and deadline.expired:
+        raise HTTPRequestTimeout(
+            code='DeadlineExceeded',
+            message='Request deadline exceeded while reading the payload'
+        )
+
+
+class DeadlineMiddleware:
+    def __init__(self, default_timeout=None, max_timeout=None, header='X-Request-Timeout'):
+        self._default_timeout = default_timeout
+        self._max_timeout = max_timeout
+        self._header = header
+
+    def process_request(self, req, resp):
+        req.context[START_CONTEXT_KEY] = time.monotonic()
+        timeout = self._get_header_timeout(req)
+        if timeout is not None:
+            self._set_deadline(req, timeout)
+
+    def process_resource(self, req, resp, resource, params):
+        if get_deadline(req) is not None:
+            return
+
+        timeout = getattr(resource, 'request_timeout', self._default_timeout)
+        if timeout is not None:
+            self._set_deadline(req, timeout)
+
+    def _get_header_timeout(self, req):
+        value = req.get_header(self._header)
+        if value is None:
+            return None
+
+        try:
+            timeout = float(value)
+        except ValueError:
+            raise HTTPInvalidHeader('The value must be a number of seconds', self._header)
+
+        if not math.isfinite(timeout):
+            raise HTTPInvalidHeader('The value must be a finite number of seconds', self._header)
+        if timeout < 0:
+            raise HTTPInvalidHeader('The value must not be negative', self._header)
+        return timeout
+
+    def _set_deadline(self, req, timeout):
+        if self._max_timeout is not None:
+            timeout = min(timeout, self._max_timeout)
+        req.context[DEADLINE_CONTEXT_KEY] = Deadline.after(
+            timeout,
+            started_at=req.context.get(START_CONTEXT_KEY)
+        )
@@ -0,0 +1,148 @@
+from urllib.parse import unquote_to_bytes
+
+from wizeline.falcon.errors.http import HTTPBadRequest
+
+MAX_DEPTH = 32
+
+_MISSING = object()
+
+
+class FormParser:
+    """Incremental parser for application/x-www-form-urlencoded bodies.
+
+    Bracketed keys build nested values (`user[name]=x`, `tags[]=a`) and
+    repeated keys become lists. When `fields` is given only those top
+    level names are decoded; the bytes of any other field are dropped as
+    they stream in. `fields` may be a dict mapping names to a callable
+    (e.g. `int` or `json.loads`) used to coerce each value.
+    """
+
+    def __init__(self, fields=None, encoding='utf-8'):
+        self._fields = fields
+        self._encoding = encoding
+        self._pending = bytearray()
+        self._name = None
+        self._skipping = False
+        self._result = {}
+
+    def feed(self, chunk):
+        pieces = bytes(chunk).split(b'&')
+        for piece in pieces[:-1]:
+            self._append(piece)
+            self._flush()
+        self._append(pieces[-1])
+
+    def close(self):
+        self._flush()
+        return self._result
+
+    def _append(self, piece):
+        if self._skipping:
+            return
+
+        self._pending += piece
+        if self._fields is not None and self._name is None:
+            index = self._pending.find(b'=')
+            if index != -1:
+                self._name = self._decode(self._pending[:index])
+                if _split_key(self._name)[0] not in self._fields:
+                    self._skipping = True
+                    self._pending = bytearray()
+
+    def _flush(self):
+        if not self._skipping and self._pending:
+            key, _, value = bytes(self._pending).partition(b'=')
+            add_field(self._result, self._decode(key), self._decode(value), self._fields)
+        self._pending = bytearray()
+        self._name = None
+        self._skipping = False
+
+    def _decode(self, value):
+        try:
+            return unquote_to_bytes(bytes(value).replace(b'+', b' ')).decode(self._encoding)
+        except UnicodeDecodeError:
+            raise HTTPBadRequest(
+                code='InvalidForm',
+                message=f'The form is not valid {self._encoding}'
+            )
+
+
+def parse_form(chunks, fields=None, encoding='utf-8'):
+    parser = FormParser(fields, encoding)
+    for chunk in chunks:
+        parser.feed(chunk)
+    return parser.close()
+
+
+def parse_form_params(params, fields=None):
+    """Build the same structure from params Falcon already decoded."""
+    result = {}
+    for name, values in params.items():
+        for value in (values if isinstance(values, list) else (values,)):
+            add_field(result, name, value, fields)
+    return result
+
+
+def add_field(result, name, value, fields=None):
+    path = _split_key(name)
+    if fields is not None:
+        if path[0] not in fields:
+            return
+        value = _coerce(path[0], value, fields)
+    _insert(result, path, value)
+
+
+def _coerce(name, value, fields):
+    coerce = fields.get(name) if isinstance(fields, dict) else None
+    if coerce is None:
+        return value
+
+    try:
+        return coerce(value)
+    except ValueError:
+        raise HTTPBadRequest(
+            code='InvalidFormField',
+            message=f'Invalid value for form field {name}'
+        )
+
+
+def _split_key(name, max_depth=MAX_DEPTH):
+    start = name.find('[')
+    if start <= 0 or not name.endswith(']'):
+        return [name]
+
+    path = [name[:start]] + name[start + 1:-1].split('][', max_depth)
+    if len(path) > max_depth:
+        raise HTTPBadRequest(
+            code='InvalidForm',
+            message=f'Form field names can not be nested more than {max_depth} levels'
+        )
+    return path
+
+
+def _insert(container, path, value):
+    key, rest = path[0], path[1:]
+
+    if isinstance(container, list):
+        if rest:
+            child = [] if rest[0] == '' else {}
+            container.append(child)
+            _insert(child, rest, value)
+        else:
+            container.append(value)
+        return
+
+    if not rest:
+        existing = container.get(key, _MISSING)
+        if existing is _MISSING:
+            container[key] = value
+        elif isinstance(existing, list):
+            existing.append(value)
+        else:
+            container[key] = [existing, value]
+        return
+
+    child = container.get(key)
+    if not isinstance(child, (dict, list)):
+        child = container[key] = [] if rest[0] == '' else {}
+    _insert(child, rest, value)
@@ -2,16 +2,75 @@ import json
 from json import JSONDecodeError
 
 from falcon import (
-    HTTPUnsupportedMediaType,
-    HTTPBadRequest,
-    HTTPInternalServerError
+    HTTPError,
+    HTTPUnsupportedMediaType
 )
 
+from wizeline.falcon.errors.http import HTTPBadRequest, HTTPInternalServerError
+from wizeline.falcon.middlewares.batching import BATCHER_CONTEXT_KEY
+from wizeline.falcon.middlewares.body import get_body, iter_body
+from wizeline.falcon.middlewares.codecs import JSON_CODEC, JSON_MEDIA_TYPE, create_default_registry
+from wizeline.falcon.middlewares.ndjson import is_ndjson_content_type, iter_json_lines, set_json_lines_response
+
+ERROR_DETAIL_NONE = 'none'
+ERROR_DETAIL_POSITION = 'position'
+ERROR_DETAIL_SNIPPET = 'snippet'
+ERROR_DETAILS = (ERROR_DETAIL_NONE, ERROR_DETAIL_POSITION, ERROR_DETAIL_SNIPPET)
+
+
+def describe_json_error(error, text, detail=ERROR_DETAIL_SNIPPET, snippet_size=20):
+    """Describe a JSONDecodeError with a message of bounded size.
+
+    The payload itself is never embedded; at most `snippet_size`
+    characters on each side of the failing offset are included.
+    """
+    if detail == ERROR_DETAIL_NONE:
+        return 'Invalid JSON received'
+
+    message = f'Invalid JSON received: {error.msg} at line {error.lineno} column {error.colno} (char {error.pos})'
+    if detail == ERROR_DETAIL_SNIPPET:
+        start = max(0, error.pos - snippet_size)
+        snippet = text[start:error.pos + snippet_size]
+        message += f' near {snippet!r}'
+    return message
+
 
 class JSONMiddleware:
+    """Parses request payloads into `req.json` and serializes `resp.json`.
+
+    With `envelope=True` responses are rendered as
+    `{"data": resp.json, "meta": resp.meta}`; for JSON the envelope is
+    written around the already encoded payload instead of wrapping it in
+    another dict. `serialize_error` renders errors as `{"error": ...}` and
+    is installed with `api.set_error_serializer(middleware.serialize_error)`.
+
+    Resources with a `batcher` attribute (a Batcher) have their parsed
+    `req.json` batched; handlers submit it and collect their own result
+    with `get_batch_result(req)`.
+    """
+
+    def __init__(self, codecs=None, error_detail=ERROR_DETAIL_SNIPPET, snippet_size=20, envelope=False):
+        if error_detail not in ERROR_DETAILS:
+            raise ValueError(f'error_detail must be one of {ERROR_DETAILS}')
+
+        self._codecs = codecs if codecs is not None else create_default_registry()
+        self._error_detail = error_detail
+        self._snippet_size = snippet_size
+        self._envelope = envelope
+
     def process_resource(self, req, resp, resource, params):
         if (self._is_middleware_enabled(resource)
            and self._has_request_method_payload(req)):
+            if is_ndjson_content_type(req.content_type):
+                req.json_lines = iter_json_lines(iter_body(req))
+                return
+
+            codec = self._codecs.for_content_type(req.content_type)
+            if codec is not None and codec is not JSON_CODEC:
+                req.json = self._decode_payload(req, codec)
+                self._set_batcher(req, resource)
+                return
+
             if not self._is_content_type_valid(req):
                 raise HTTPUnsupportedMediaType()
 
@@ -20,18 +79,56 @@ class JSONMiddleware:
                 req.json = (json.loads(req.text, encoding='utf-8')
                             if req.text.strip() != '' else {})
             except JSONDecodeError as error:
-                raise HTTPBadRequest(f'Invalid JSON received: error={error}, payload={req.text}')
+                raise HTTPBadRequest(
+                    code='InvalidJSON',
+                    message=describe_json_error(error, req.text, self._error_detail, self._snippet_size)
+                )
+            except HTTPError:
+                raise
             except Exception as error:
-                raise HTTPInternalServerError(f'Unexpected error: error={error}, payload={req.text}')
+                raise HTTPInternalServerError(
+                    code='UnexpectedError',
+                    message=f'Unexpected error reading the payload: {type(error).__name__}'
+                )
+            self._set_batcher(req, resource)
 
     def process_response(self, req, resp, resource, req_succeeded):
-        if not self._has_body(resp):
-            resp.body = self._serialize_json_to_string(resp)
+        if self._has_json_lines(resp) and not self._has_body(resp):
+            set_json_lines_response(resp)
+        elif not self._has_body(resp):
+            codec = self._codecs.for_accept(req.accept) or JSON_CODEC
+            if codec is JSON_CODEC:
+                resp.body = self._serialize_json_to_string(resp)
+            else:
+                document = self._get_response_document(resp)
+                if self._envelope:
+                    document = {'data': document, 'meta': self._get_response_meta(resp)}
+                resp.data = codec.dumps(document)
+                resp.content_type = codec.media_type
+            resp.append_header('Vary', 'Accept')
+
+    def serialize_error(self, req, resp, exception):
+        if not exception.has_representation:
+            return
+
+        codec = self._codecs.for_accept(req.accept) or JSON_CODEC
+        if codec is JSON_CODEC:
+            resp.body = '{"error":' + json.dumps(exception.to_dict()) + '}'
+            resp.content_type = JSON_MEDIA_TYPE
+        else:
+            resp.data = codec.dumps({'error': exception.to_dict()})
+            resp.content_type = codec.media_type
+        resp.append_header('Vary', 'Accept')
 
     def _is_middleware_enabled(self, resource):
         return (not hasattr(resource, 'disable_json_middleware')
                 or not resource.disable_json_middleware)
 
+    def _set_batcher(self, req, resource):
+        batcher = getattr(resource, 'batcher', None)
+        if batcher is not None:
+            req.context[BATCHER_CONTEXT_KEY] = batcher
+
     def _has_request_method_payload(self, req):
         return req.method in ('POST', 'PUT')
 
@@ -39,17 +136,48 @@ class JSONMiddleware:
         return req.content_type and ('application/json' in req.content_type or 'text/json' in req.content_type)
 
     def _get_payload(self, req):
-        return req.bounded_stream.read().decode('utf-8')
+        return get_body(req).decode()
+
+    def _decode_payload(self, req, codec):
+        body = get_body(req)
+        if not len(body):
+            return {}
+
+        try:
+            return codec.loads(body.tobytes())
+        except HTTPError:
+            raise
+        except Exception as error:
+            raise HTTPBadRequest(
+                code='InvalidPayload',
+                message=f'Invalid {codec.media_type} received: {type(error).__name__}'
+            )
 
     def _has_body(self, resp):
         return resp.body is not None
 
     def _serialize_json_to_string(self, resp):
+        data = json.dumps(self._get_response_document(resp))
+        if not self._envelope:
+            return data
+        return '{"data":' + data + ',"meta":' + json.dumps(self._get_response_meta(resp)) + '}'
+
+    def _get_response_meta(self, resp):
+        meta = getattr(resp, 'meta', None)
+        return meta if meta is not None else {}
+
+    def _get_response_document(self, resp):
         if self._has_json(resp):
             if not isinstance(resp.json, (dict, list)):
-                raise HTTPInternalServerError(f'Unexpected error parsing response: payload={resp.json}')
-            return json.dumps(resp.json)
-        return json.dumps({})
+                raise HTTPInternalServerError(
+                    code='InvalidResponse',
+                    message=f'The response payload must be a dict or a list, not {type(resp.json).__name__}'
+                )
+            return resp.json
+        return {}
 
     def _has_json(self, resp):
         return hasattr(resp, 'json')
+
+    def _has_json_lines(self, resp):
+        return hasattr(resp, 'json_lines')
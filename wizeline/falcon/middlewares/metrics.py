@@ -0,0 +1,379 @@
+import glob
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+import types
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict
+
+from falcon import HTTPError
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BODY_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_HEADER = struct.Struct('Q')
+_LENGTH = struct.Struct('I')
+_VALUE = struct.Struct('d')
+
+
+class _MemoryValues:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def add(self, items):
+        with self._lock:
+            for key, amount in items:
+                self._values[key] = self._values.get(key, 0.0) + amount
+
+    def items(self):
+        with self._lock:
+            return list(self._values.items())
+
+
+class _MmapValues:
+    """Values of one process stored in a memory mapped file.
+
+    The file starts with the number of used bytes followed by entries of
+    (key length, key padded to 8 bytes, float64 value). Only the owning
+    process writes it, so the lock is never contended across workers.
+    """
+
+    INITIAL_SIZE = 64 * 1024
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._positions = {}
+        self._file = open(path, 'a+b')
+        size = max(os.fstat(self._file.fileno()).st_size, self.INITIAL_SIZE)
+        self._file.truncate(size)
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+        self._used = _HEADER.unpack_from(self._mmap, 0)[0] or _HEADER.size
+        for key, _, position in _read_entries(self._mmap, self._used):
+            self._positions[key] = position
+
+    def add(self, items):
+        with self._lock:
+            for key, amount in items:
+                position = self._positions.get(key)
+                if position is None:
+                    position = self._create(key)
+                value = _VALUE.unpack_from(self._mmap, position)[0]
+                _VALUE.pack_into(self._mmap, position, value + amount)
+
+    def _create(self, key):
+        encoded = key.encode('utf-8')
+        padded = len(encoded) + (-(_LENGTH.size + len(encoded)) % 8)
+        entry_size = _LENGTH.size + padded + _VALUE.size
+        if self._used + entry_size > len(self._mmap):
+            self._grow(self._used + entry_size)
+
+        start = self._used
+        _LENGTH.pack_into(self._mmap, start, len(encoded))
+        self._mmap[start + _LENGTH.size:start + _LENGTH.size + len(encoded)] = encoded
+        position = start + _LENGTH.size + padded
+        _VALUE.pack_into(self._mmap, position, 0.0)
+
+        self._used += entry_size
+        _HEADER.pack_into(self._mmap, 0, self._used)
+        self._positions[key] = position
+        return position
+
+    def _grow(self, required):
+        size = len(self._mmap)
+        while size < required:
+            size *= 2
+        self._mmap.close()
+        self._file.truncate(size)
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+
+    def items(self):
+        with self._lock:
+            return [(key, value) for key, value, _ in _read_entries(self._mmap, self._used)]
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+
+def _read_entries(buffer, used):
+    offset = _HEADER.size
+    while offset < used:
+        length = _LENGTH.unpack_from(buffer, offset)[0]
+        key = bytes(buffer[offset + _LENGTH.size:offset + _LENGTH.size + length]).decode('utf-8')
+        position = offset + _LENGTH.size + length + (-(_LENGTH.size + length) % 8)
+        yield key, _VALUE.unpack_from(buffer, position)[0], position
+        offset = position + _VALUE.size
+
+
+def _read_file(path):
+    with open(path, 'rb') as file:
+        data = file.read()
+    if len(data) < _HEADER.size:
+        return []
+    used = _HEADER.unpack_from(data, 0)[0]
+    return [(key, value) for key, value, _ in _read_entries(data, min(used, len(data)))]
+
+
+def _key(family, sample, labels):
+    return json.dumps([family, sample, labels])
+
+
+class _CounterChild:
+    __slots__ = ('_registry', '_key')
+
+    def __init__(self, registry, key):
+        self._registry = registry
+        self._key = key
+
+    def inc(self, amount=1.0):
+        self._registry.add(((self._key, amount),))
+
+
+class _HistogramChild:
+    __slots__ = ('_registry', '_buckets', '_bucket_keys', '_sum_key', '_count_key')
+
+    def __init__(self, registry, buckets, bucket_keys, sum_key, count_key):
+        self._registry = registry
+        self._buckets = buckets
+        self._bucket_keys = bucket_keys
+        self._sum_key = sum_key
+        self._count_key = count_key
+
+    def observe(self, value):
+        bucket_key = self._bucket_keys[bisect_left(self._buckets, value)]
+        self._registry.add(((bucket_key, 1.0), (self._sum_key, value), (self._count_key, 1.0)))
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, registry, name, documentation, labelnames):
+        self._registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f'{self.name} expects labels {self.labelnames}')
+            child = self._children[values] = self._create_child([[name, str(value)] for name, value
+                                                                 in zip(self.labelnames, values)])
+        return child
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def _create_child(self, labels):
+        return _CounterChild(self._registry, _key(self.name, self.name + '_total', labels))
+
+    def inc(self, amount=1.0):
+        self.labels().inc(amount)
+
+    def render(self, samples):
+        for (sample, labels), value in sorted(samples.items()):
+            yield _sample(sample, labels, value)
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames, buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def _create_child(self, labels):
+        return _HistogramChild(
+            self._registry,
+            self.buckets,
+            [_key(self.name, self.name + '_bucket', labels + [['le', _format_value(bound)]])
+             for bound in self.buckets],
+            _key(self.name, self.name + '_sum', labels),
+            _key(self.name, self.name + '_count', labels)
+        )
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def render(self, samples):
+        series = defaultdict(dict)
+        for (sample, labels), value in samples.items():
+            base = tuple(label for label in labels if label[0] != 'le')
+            series[base][sample if sample != self.name + '_bucket' else dict(labels)['le']] = value
+
+        for labels, values in sorted(series.items()):
+            cumulative = 0.0
+            for bound in self.buckets:
+                cumulative += values.get(_format_value(bound), 0.0)
+                yield _sample(self.name + '_bucket', labels + (('le', _format_value(bound)),), cumulative)
+            yield _sample(self.name + '_sum', labels, values.get(self.name + '_sum', 0.0))
+            yield _sample(self.name + '_count', labels, values.get(self.name + '_count', 0.0))
+
+
+class MetricsRegistry:
+    """Counters and histograms shared by the wizeline middlewares.
+
+    Without `directory` values live in process memory. With it, every
+    worker process writes its own memory mapped file in that directory
+    and `render()` sums the files of all workers, so forked servers
+    expose a single view of the application.
+    """
+
+    def __init__(self, directory=None):
+        self._directory = directory
+        self._families = OrderedDict()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._values = None
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def _register(self, metric_class, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._families.get(name)
+            if metric is None:
+                metric = self._families[name] = metric_class(self, name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, metric_class) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f'Metric {name} is already registered with a different definition')
+            return metric
+
+    def add(self, items):
+        pid = os.getpid()
+        if pid != self._pid:
+            self._open(pid)
+        self._values.add(items)
+
+    def _open(self, pid):
+        with self._lock:
+            if pid == self._pid:
+                return
+            self._close_values()
+            if self._directory is None:
+                self._values = _MemoryValues()
+            else:
+                self._values = _MmapValues(os.path.join(self._directory, f'metrics_{pid}.db'))
+            self._pid = pid
+
+    def close(self):
+        with self._lock:
+            self._close_values()
+            self._pid = None
+
+    def _close_values(self):
+        if isinstance(self._values, _MmapValues):
+            self._values.close()
+        self._values = None
+
+    def collect(self):
+        if self._directory is None:
+            return self._values.items() if self._values is not None else []
+
+        totals = defaultdict(float)
+        for path in glob.glob(os.path.join(self._directory, 'metrics_*.db')):
+            for key, value in _read_file(path):
+                totals[key] += value
+        return totals.items()
+
+    def render(self):
+        samples = defaultdict(dict)
+        for key, value in self.collect():
+            family, sample, labels = json.loads(key)
+            samples[family][(sample, tuple(tuple(label) for label in labels))] = value
+
+        lines = []
+        for name, metric in self._families.items():
+            lines.append(f'# HELP {name} {_escape(metric.documentation, help_text=True)}')
+            lines.append(f'# TYPE {name} {metric.type}')
+            lines.extend(metric.render(samples.get(name, {})))
+        return '\n'.join(lines) + '\n'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value))
+
+
+def _format_number(value):
+    if value != math.inf and float(value).is_integer():
+        return str(int(value))
+    return _format_value(value)
+
+
+def _escape(value, help_text=False):
+    value = value.replace('\\', '\\\\').replace('\n', '\\n')
+    return value if help_text else value.replace('"', '\\"')
+
+
+def _sample(name, labels, value):
+    if labels:
+        name += '{' + ','.join(f'{label}="{_escape(label_value)}"' for label, label_value in labels) + '}'
+    return f'{name} {_format_number(value)}'
+
+
+class MetricsResource:
+    """Falcon resource rendering a registry in the Prometheus text format."""
+
+    disable_json_middleware = True
+    disable_body_parser_middleware = True
+
+    def __init__(self, registry):
+        self._registry = registry
+
+    def on_get(self, req, resp):
+        resp.content_type = CONTENT_TYPE
+        resp.body = self._registry.render()
+
+
+def instrument(middleware, registry):
+    """Count requests and rejections of a middleware and its body sizes.
+
+    The middleware's process_resource is wrapped in place, so the same
+    object keeps being used in the `falcon.API(middleware=[...])` list.
+    """
+    requests = registry.counter(
+        'wizeline_middleware_requests',
+        'Requests processed by each wizeline middleware',
+        ('middleware',)
+    )
+    rejections = registry.counter(
+        'wizeline_middleware_rejections',
+        'Requests rejected by each wizeline middleware',
+        ('middleware', 'status')
+    )
+    body_sizes = registry.histogram(
+        'wizeline_request_body_bytes',
+        'Declared request body sizes seen by each wizeline middleware',
+        ('middleware',),
+        buckets=BODY_SIZE_BUCKETS
+    )
+
+    name = type(middleware).__name__
+    processed = requests.labels(name)
+    body_size = body_sizes.labels(name)
+    process_resource = middleware.process_resource
+
+    def instrumented_process_resource(self, req, resp, resource, params):
+        processed.inc()
+        if req.content_length:
+            body_size.observe(req.content_length)
+        try:
+            process_resource(req, resp, resource, params)
+        except HTTPError as error:
+            rejections.labels(name, error.status[:3]).inc()
+            raise
+
+    middleware.process_resource = types.MethodType(instrumented_process_resource, middleware)
+    return middleware
@@ -0,0 +1,244 @@
+import json
+import re
+import tempfile
+
+from falcon import HTTPError, HTTPRequestEntityTooLarge
+
+from wizeline.falcon.errors.http import HTTPBadRequest
+from wizeline.falcon.middlewares.form import add_field
+
+SPOOL_SIZE = 512 * 1024
+
+_PREAMBLE, _DELIMITER, _HEADERS, _BODY, _END = range(5)
+_HEADER_PARAM = re.compile(r';\s*([\w*-]+)\s*=\s*(?:"((?:[^"\\]|\\.)*)"|([^;\s]*))')
+
+
+class UploadedFile:
+    __slots__ = ('name', 'filename', 'content_type', 'headers', 'stream', 'size')
+
+    def __init__(self, name, filename, content_type, headers, stream):
+        self.name = name
+        self.filename = filename
+        self.content_type = content_type
+        self.headers = headers
+        self.stream = stream
+        self.size = 0
+
+    def read(self, size=-1):
+        return self.stream.read(size)
+
+    def close(self):
+        self.stream.close()
+
+
+class _Part:
+    __slots__ = ('name', 'filename', 'content_type', 'headers', 'data', 'file', 'size')
+
+    def __init__(self, headers, spool_size):
+        disposition, params = parse_header(headers.get('content-disposition', ''))
+        if disposition != 'form-data' or 'name' not in params:
+            raise _invalid('Every part must have a form-data Content-Disposition with a name')
+
+        self.name = params['name']
+        self.filename = params.get('filename')
+        self.content_type = parse_header(headers.get('content-type', 'text/plain'))[0]
+        self.headers = headers
+        self.size = 0
+        self.data = None
+        self.file = None
+        if self.filename is not None:
+            self.file = UploadedFile(
+                self.name,
+                self.filename,
+                self.content_type,
+                headers,
+                tempfile.SpooledTemporaryFile(max_size=spool_size)
+            )
+        else:
+            self.data = bytearray()
+
+    def write(self, data):
+        self.size += len(data)
+        if self.file is not None:
+            self.file.stream.write(data)
+        else:
+            self.data += data
+
+
+class MultipartParser:
+    """Incremental parser for multipart/form-data bodies.
+
+    Text parts are decoded into `fields`, parts sent as application/json
+    are parsed, and parts with a filename are written to spooled temporary
+    files exposed through `files` as UploadedFile objects.
+    """
+
+    def __init__(self, boundary, max_part_size=None, max_size=None, spool_size=SPOOL_SIZE, encoding='utf-8'):
+        if not boundary:
+            raise _invalid('The multipart boundary is missing')
+
+        self._delimiter = b'\r\n--' + boundary.encode('latin-1')
+        self._max_part_size = max_part_size
+        self._max_size = max_size
+        self._spool_size = spool_size
+        self._encoding = encoding
+        self._buffer = bytearray(b'\r\n')
+        self._state = _PREAMBLE
+        self._part = None
+        self._size = 0
+        self.fields = {}
+        self.files = {}
+
+    def feed(self, chunk):
+        self._size += len(chunk)
+        try:
+            if self._max_size is not None and self._size > self._max_size:
+                raise _too_large(f'The multipart body must not exceed {self._max_size} bytes')
+
+            self._buffer += chunk
+            while self._step():
+                pass
+        except HTTPError:
+            self._discard()
+            raise
+
+    def close(self):
+        if self._state != _END:
+            self._discard()
+            raise _invalid('The multipart body is incomplete')
+        return self.fields, self.files
+
+    def _step(self):
+        if self._state == _PREAMBLE:
+            index = self._buffer.find(self._delimiter)
+            if index == -1:
+                del self._buffer[:-len(self._delimiter)]
+                return False
+            del self._buffer[:index + len(self._delimiter)]
+            self._state = _DELIMITER
+            return True
+
+        if self._state == _DELIMITER:
+            return self._after_delimiter()
+
+        if self._state == _HEADERS:
+            if self._buffer[:2] == b'\r\n':
+                headers, end = {}, 2
+            else:
+                index = self._buffer.find(b'\r\n\r\n')
+                if index == -1:
+                    return False
+                headers, end = self._parse_headers(bytes(self._buffer[:index])), index + 4
+            del self._buffer[:end]
+            self._part = _Part(headers, self._spool_size)
+            self._state = _BODY
+            return True
+
+        if self._state == _BODY:
+            index = self._buffer.find(self._delimiter)
+            if index == -1:
+                keep = len(self._delimiter) - 1
+                if len(self._buffer) > keep:
+                    self._write(self._buffer[:-keep])
+                    del self._buffer[:-keep]
+                return False
+            self._write(self._buffer[:index])
+            del self._buffer[:index + len(self._delimiter)]
+            self._finish_part()
+            self._state = _DELIMITER
+            return True
+
+        return False
+
+    def _after_delimiter(self):
+        if len(self._buffer) < 2:
+            return False
+        if self._buffer[:2] == b'--':
+            self._state = _END
+            self._buffer = bytearray()
+            return False
+
+        index = self._buffer.find(b'\r\n')
+        if index == -1:
+            return False
+        del self._buffer[:index + 2]
+        self._state = _HEADERS
+        return True
+
+    def _parse_headers(self, data):
+        try:
+            lines = data.decode(self._encoding).split('\r\n')
+        except UnicodeDecodeError:
+            raise _invalid('Malformed part header')
+
+        headers = {}
+        for line in lines:
+            name, separator, value = line.partition(':')
+            if not separator:
+                raise _invalid('Malformed part header')
+            headers[name.strip().lower()] = value.strip()
+        return headers
+
+    def _write(self, data):
+        part = self._part
+        if self._max_part_size is not None and part.size + len(data) > self._max_part_size:
+            raise _too_large(f'A multipart part must not exceed {self._max_part_size} bytes')
+        part.write(data)
+
+    def _finish_part(self):
+        part, self._part = self._part, None
+
+        if part.file is not None:
+            part.file.size = part.size
+            part.file.stream.seek(0)
+            _append(self.files, part.name, part.file)
+            return
+
+        try:
+            text = part.data.decode(self._encoding)
+            value = json.loads(text) if part.content_type == 'application/json' else text
+        except ValueError:
+            raise _invalid(f'Invalid value for multipart field {part.name}')
+        add_field(self.fields, part.name, value)
+
+    def _discard(self):
+        if self._part is not None and self._part.file is not None:
+            self._part.file.close()
+        for uploads in self.files.values():
+            for upload in (uploads if isinstance(uploads, list) else (uploads,)):
+                upload.close()
+
+
+def parse_header(value):
+    """Split a header such as Content-Disposition into value and params."""
+    main, _, rest = value.partition(';')
+    params = {}
+    for match in _HEADER_PARAM.finditer(';' + rest):
+        name, quoted, token = match.groups()
+        params[name.lower()] = re.sub(r'\\(.)', r'\1', quoted) if quoted is not None else token
+    return main.strip().lower(), params
+
+
+def parse_multipart(chunks, boundary, **kwargs):
+    parser = MultipartParser(boundary, **kwargs)
+    for chunk in chunks:
+        parser.feed(chunk)
+    return parser.close()
+
+
+def _append(container, name, value):
+    existing = container.get(name)
+    if existing is None:
+        container[name] = value
+    elif isinstance(existing, list):
+        existing.append(value)
+    else:
+        container[name] = [existing, value]
+
+
+def _invalid(message):
+    return HTTPBadRequest(code='InvalidMultipart', message=message)
+
+
+def _too_large(message):
+    return HTTPRequestEntityTooLarge('Request body too large', message)
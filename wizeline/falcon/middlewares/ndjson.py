@@ -0,0 +1,74 @@
+import json
+
+from wizeline.falcon.errors.http import HTTPBadRequest
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+NDJSON_CONTENT_TYPES = (NDJSON_CONTENT_TYPE, 'application/jsonlines', 'application/json-lines', 'application/jsonl')
+FLUSH_SIZE = 64 * 1024
+
+
+def is_ndjson_content_type(content_type):
+    return bool(content_type) and any(media_type in content_type for media_type in NDJSON_CONTENT_TYPES)
+
+
+def iter_json_lines(chunks, encoding='utf-8'):
+    """Lazily parse newline delimited JSON from an iterable of byte chunks.
+
+    Documents are yielded as soon as their line is complete, so a handler
+    can process a partial batch while the rest of the body is still
+    arriving. Blank lines are skipped.
+    """
+    pending = bytearray()
+    line_number = 0
+    for chunk in chunks:
+        pending += chunk
+        start = 0
+        end = pending.find(b'\n')
+        while end != -1:
+            line_number += 1
+            line = pending[start:end]
+            if line.strip():
+                yield _loads(line, line_number, encoding)
+            start = end + 1
+            end = pending.find(b'\n', start)
+        del pending[:start]
+
+    if pending.strip():
+        yield _loads(pending, line_number + 1, encoding)
+
+
+def _loads(line, line_number, encoding):
+    try:
+        return json.loads(line.decode(encoding))
+    except ValueError:
+        raise HTTPBadRequest(
+            code='InvalidJSONLine',
+            message=f'Invalid JSON received on line {line_number}'
+        )
+
+
+def encode_json_lines(documents, flush_size=FLUSH_SIZE):
+    """Encode an iterable of documents as NDJSON byte chunks.
+
+    Lines are grouped into chunks of about `flush_size` bytes so memory
+    stays constant regardless of how many documents are produced.
+    """
+    encoder = json.JSONEncoder()
+    buffer = []
+    size = 0
+    for document in documents:
+        line = encoder.encode(document).encode('utf-8') + b'\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= flush_size:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+
+    if buffer:
+        yield b''.join(buffer)
+
+
+def set_json_lines_response(resp):
+    resp.content_type = NDJSON_CONTENT_TYPE
+    resp.stream = encode_json_lines(resp.json_lines)
@@ -0,0 +1,122 @@
+import falcon
+
+
+class _Chain:
+    __slots__ = ('resource_steps', 'response_steps')
+
+    def __init__(self, resource_steps, response_steps):
+        self.resource_steps = resource_steps
+        self.response_steps = response_steps
+
+
+class PipelineMiddleware:
+    """Runs several middlewares as one, skipping those disabled per resource.
+
+    Falcon calls every middleware method for every request. Here the
+    process_resource steps enabled for each resource (according to each
+    middleware's `_is_middleware_enabled`, e.g. `disable_json_middleware`,
+    `disable_body_parser_middleware` or `is_api_secret_required`) are
+    computed once, ahead of time for the given routes, so a disabled
+    middleware costs nothing at request time. Those flags only gate
+    process_resource, so every process_response step always runs.
+
+    As with a plain falcon.API, a failing process_response does not stop
+    the remaining ones, and when a process_request fails the middlewares
+    before it still get their process_response.
+    """
+
+    def __init__(self, middlewares, resources=()):
+        self._middlewares = list(middlewares)
+        self._request_steps = tuple(
+            (middleware.process_request, self._response_steps_of(self._middlewares[:index]))
+            for index, middleware in enumerate(self._middlewares)
+            if hasattr(middleware, 'process_request')
+        )
+        self._response_steps = self._response_steps_of(self._middlewares)
+        self._default_chain = self._compile(None)
+        self._chains = {}
+        for resource in resources:
+            self.chain_for(resource)
+
+    def _response_steps_of(self, middlewares):
+        return tuple(
+            middleware.process_response for middleware in reversed(middlewares)
+            if hasattr(middleware, 'process_response')
+        )
+
+    def _compile(self, resource):
+        enabled = [middleware for middleware in self._middlewares
+                   if resource is None or self._is_enabled(middleware, resource)]
+        return _Chain(
+            tuple(middleware.process_resource for middleware in enabled
+                  if hasattr(middleware, 'process_resource')),
+            self._response_steps
+        )
+
+    def _is_enabled(self, middleware, resource):
+        is_enabled = getattr(middleware, '_is_middleware_enabled', None)
+        return is_enabled is None or is_enabled(resource)
+
+    def chain_for(self, resource):
+        if resource is None:
+            return self._default_chain
+
+        # The resource is kept with its chain so its id can not be reused
+        # by another resource while the entry exists.
+        entry = self._chains.get(id(resource))
+        if entry is None or entry[0] is not resource:
+            entry = self._chains[id(resource)] = (resource, self._compile(resource))
+        return entry[1]
+
+    def process_request(self, req, resp):
+        for step, response_steps in self._request_steps:
+            try:
+                step(req, resp)
+            except Exception as error:
+                _set_error_status(resp, error)
+                _run_response_steps(response_steps, req, resp, None, False)
+                raise
+
+    def process_resource(self, req, resp, resource, params):
+        for step in self.chain_for(resource).resource_steps:
+            step(req, resp, resource, params)
+
+    def process_response(self, req, resp, resource, req_succeeded):
+        error = _run_response_steps(self.chain_for(resource).response_steps, req, resp, resource, req_succeeded)
+        if error is not None:
+            raise error
+
+
+def _set_error_status(resp, error):
+    # Falcon renders the error only once the pipeline re-raises it, so the
+    # status is set here for the response steps that still have to run.
+    if isinstance(error, falcon.HTTPError):
+        resp.status = error.status
+
+
+def _run_response_steps(steps, req, resp, resource, req_succeeded):
+    """Run every step even if some fail; return the first error raised."""
+    first_error = None
+    for step in steps:
+        try:
+            step(req, resp, resource, req_succeeded)
+        except Exception as error:
+            _set_error_status(resp, error)
+            if first_error is None:
+                first_error = error
+            req_succeeded = False
+    return first_error
+
+
+def build_api(middlewares, routes, **kwargs):
+    """Create a falcon.API running `middlewares` through one PipelineMiddleware.
+
+    `routes` maps URI templates to resources (a dict or pairs); chains for
+    all of them are precomputed before the first request.
+    """
+    routes = list(routes.items() if isinstance(routes, dict) else routes)
+    pipeline = PipelineMiddleware(middlewares, [resource for _, resource in routes])
+    api = falcon.API(middleware=[pipeline], **kwargs)
+    for uri_template, resource in routes:
+        api.add_route(uri_template, resource)
+    return api
@@ -0,0 +1,184 @@
+import cProfile
+import io
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from wizeline.falcon.errors.http import HTTPBadRequest
+
+SAMPLER = 'sampler'
+CPROFILE = 'cprofile'
+PROFILE_CONTEXT_KEY = 'profile'
+SORT_KEYS = frozenset(pstats.Stats.sort_arg_dict_default)
+
+
+class Profiler:
+    """Aggregates profiles of selected requests in memory.
+
+    In `sampler` mode a background thread snapshots the stacks of the
+    threads serving profiled requests every `interval` seconds, which
+    keeps overhead low enough for production; `collapsed()` returns them
+    in the collapsed-stack format consumed by flamegraph tools. In
+    `cprofile` mode every profiled request runs under cProfile and the
+    results are merged into a single pstats report.
+    """
+
+    def __init__(self, mode=SAMPLER, interval=0.005, max_depth=64):
+        if mode not in (SAMPLER, CPROFILE):
+            raise ValueError(f'mode must be {SAMPLER} or {CPROFILE}')
+
+        self.mode = mode
+        self._interval = interval
+        self._max_depth = max_depth
+        self._lock = threading.Lock()
+        self._stacks = Counter()
+        self._stats = None
+        self._threads = {}
+        self._active = threading.Event()
+        self._sampler = None
+        self.profiled_requests = 0
+
+    def start(self):
+        if self.mode == CPROFILE:
+            profile = cProfile.Profile()
+            profile.enable()
+            return profile
+
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._threads[thread_id] = self._threads.get(thread_id, 0) + 1
+            self._active.set()
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample, name='wizeline-profiler', daemon=True)
+                self._sampler.start()
+        return thread_id
+
+    def stop(self, token):
+        if self.mode == CPROFILE:
+            token.disable()
+            with self._lock:
+                if self._stats is None:
+                    self._stats = pstats.Stats(token)
+                else:
+                    self._stats.add(token)
+                self.profiled_requests += 1
+            return
+
+        with self._lock:
+            remaining = self._threads[token] - 1
+            if remaining:
+                self._threads[token] = remaining
+            else:
+                del self._threads[token]
+                if not self._threads:
+                    self._active.clear()
+            self.profiled_requests += 1
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        while True:
+            self._active.wait()
+            frames = sys._current_frames()
+            with self._lock:
+                thread_ids = [thread_id for thread_id in self._threads if thread_id != own_id]
+            for thread_id in thread_ids:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    stack = self._collapse(frame)
+                    with self._lock:
+                        self._stacks[stack] += 1
+            del frames
+            time.sleep(self._interval)
+
+    def _collapse(self, frame):
+        names = []
+        while frame is not None and len(names) < self._max_depth:
+            code = frame.f_code
+            names.append(f'{frame.f_globals.get("__name__", "?")}:{code.co_name}')
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def collapsed(self):
+        with self._lock:
+            stacks = list(self._stacks.items())
+        return ''.join(f'{stack} {count}\n' for stack, count in sorted(stacks))
+
+    def report(self, sort='cumulative', limit=50):
+        with self._lock:
+            if self._stats is None:
+                return ''
+            output = io.StringIO()
+            self._stats.stream = output
+            self._stats.sort_stats(sort).print_stats(limit)
+            return output.getvalue()
+
+    def reset(self):
+        with self._lock:
+            self._stacks.clear()
+            self._stats = None
+            self.profiled_requests = 0
+
+
+class ProfilerMiddleware:
+    """Profiles a fraction of requests, or those asking for it explicitly.
+
+    A request sending `header` is only profiled when `authorizer` (an
+    APISecretMiddleware, or any object with `has_valid_secret(req)`)
+    accepts its Authorization secret. Put this
+    middleware first so the whole middleware chain is profiled.
+    """
+
+    def __init__(self, profiler, sample_rate=0.0, header='X-Profile', authorizer=None):
+        self._profiler = profiler
+        self._sample_rate = sample_rate
+        self._header = header
+        self._authorizer = authorizer
+
+    def process_request(self, req, resp):
+        if self._should_profile(req):
+            req.context[PROFILE_CONTEXT_KEY] = self._profiler.start()
+
+    def process_response(self, req, resp, resource, req_succeeded):
+        token = req.context.pop(PROFILE_CONTEXT_KEY, None)
+        if token is not None:
+            self._profiler.stop(token)
+
+    def _should_profile(self, req):
+        if self._is_requested(req):
+            return True
+        return self._sample_rate > 0 and random.random() < self._sample_rate
+
+    def _is_requested(self, req):
+        return (self._authorizer is not None
+                and req.get_header(self._header) is not None
+                and self._authorizer.has_valid_secret(req))
+
+
+class ProfileResource:
+    """Dumps the aggregated profile; DELETE clears it."""
+
+    disable_json_middleware = True
+    disable_body_parser_middleware = True
+
+    def __init__(self, profiler):
+        self._profiler = profiler
+
+    def on_get(self, req, resp):
+        resp.content_type = 'text/plain; charset=utf-8'
+        if self._profiler.mode == CPROFILE:
+            sort = req.get_param('sort') or 'cumulative'
+            if sort not in SORT_KEYS:
+                raise HTTPBadRequest(
+                    code='InvalidSort',
+                    message=f'sort must be one of {", ".join(sorted(SORT_KEYS))}'
+                )
+            resp.body = self._profiler.report(sort=sort)
+        else:
+            resp.body = self._profiler.collapsed()
+
+    def on_delete(self, req, resp):
+        self._profiler.reset()
+        resp.body = ''
@@ -1,9 +1,29 @@
 import falcon
 
+from wizeline.falcon.middlewares.tenants import TENANT_CONTEXT_KEY
 
-def require_secret(req, resp, resource, params):
+
+def require_secret(req, resp, resource, params, registry=None):
+    """Hook rejecting requests without a valid Authorization secret.
+
+    With `registry`, e.g. `falcon.before(require_secret, registry)`, the
+    secret is looked up in that TenantRegistry and its tenant attached to
+    the request. Otherwise a tenant attached by TenantMiddleware, or the
+    secret of APISecretMiddleware, is required.
+    """
     secret = req.get_header('Authorization')
-    if not req._secret == secret:
+    if registry is not None:
+        tenant = registry.lookup(secret)
+        if tenant is None:
+            raise falcon.HTTPUnauthorized
+        req.context[TENANT_CONTEXT_KEY] = tenant
+        return
+
+    if req.context.get(TENANT_CONTEXT_KEY) is not None:
+        return
+
+    expected = getattr(req, '_secret', None)
+    if expected is None or not expected == secret:
         raise falcon.HTTPUnauthorized
 
 
@@ -12,12 +32,17 @@ class APISecretMiddleware:
         self._secret = secret
         self._is_secret_required = required
 
+    def has_valid_secret(self, req):
+        return self._has_valid_secret(req)
+
     def _has_valid_secret(self, req):
         return req.get_header('Authorization') == self._secret
 
+    def _is_middleware_enabled(self, resource):
+        return getattr(resource, 'is_api_secret_required', True)
+
     def process_resource(self, req, resp, resource, params):
-        is_api_secret_required = getattr(resource, 'is_api_secret_required', True)
-        if not is_api_secret_required:
+        if not self._is_middleware_enabled(resource):
             return
 
         if self._is_secret_required and not self._has_valid_secret(req):
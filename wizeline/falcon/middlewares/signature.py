@@ -0,0 +1,92 @@
+import hashlib
+import hmac
+import threading
+from collections import OrderedDict
+
+from wizeline.falcon.errors.http import HTTPUnauthorized
+from wizeline.falcon.middlewares.body import get_body
+
+
+class HMACSignatureMiddleware:
+    """Verifies HMAC signatures of webhook bodies.
+
+    `keys` is either a single key shared by every sender, a dict mapping
+    tenant ids (read from `tenant_header`) to keys, or a callable taking
+    the tenant id and returning its key or None. The keyed HMAC state is
+    built once per tenant and copied for every request; beyond
+    `max_cached_keys` tenants the least recently used one is dropped.
+    """
+
+    def __init__(
+            self,
+            keys,
+            header='X-Signature',
+            prefix='sha256=',
+            digestmod=hashlib.sha256,
+            tenant_header='X-Tenant-Id',
+            max_cached_keys=1024
+    ):
+        self._keys = keys
+        self._header = header
+        self._prefix = prefix
+        self._digestmod = digestmod
+        self._tenant_header = tenant_header
+        self._max_cached_keys = max_cached_keys
+        self._key_cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def process_resource(self, req, resp, resource, params):
+        if not self._is_middleware_enabled(resource):
+            return
+
+        signature = self._get_signature(req)
+        if signature is None:
+            raise HTTPUnauthorized(code='MissingSignature', message='The request signature is missing')
+
+        mac = self._get_mac(req)
+        if mac is None:
+            raise HTTPUnauthorized(code='UnknownTenant', message='The request signer is unknown')
+
+        get_body(req, on_chunk=mac.update)
+        if not hmac.compare_digest(mac.hexdigest().encode(), signature.encode('latin-1', 'replace')):
+            raise HTTPUnauthorized(code='InvalidSignature', message='The request signature is invalid')
+
+    def _is_middleware_enabled(self, resource):
+        return getattr(resource, 'is_signature_required', True)
+
+    def _get_signature(self, req):
+        value = req.get_header(self._header)
+        if value is None or not value.startswith(self._prefix):
+            return None
+        return value[len(self._prefix):].strip().lower()
+
+    def _get_mac(self, req):
+        tenant = req.get_header(self._tenant_header)
+        with self._lock:
+            template = self._key_cache.get(tenant)
+            if template is not None:
+                self._key_cache.move_to_end(tenant)
+        if template is None:
+            key = self._get_key(tenant)
+            if key is None:
+                return None
+            template = self._cache_key(tenant, key)
+        return template.copy()
+
+    def _get_key(self, tenant):
+        if isinstance(self._keys, dict):
+            return self._keys.get(tenant)
+        if callable(self._keys):
+            return self._keys(tenant)
+        return self._keys
+
+    def _cache_key(self, tenant, key):
+        if isinstance(key, str):
+            key = key.encode('utf-8')
+        template = hmac.new(key, digestmod=self._digestmod)
+        with self._lock:
+            self._key_cache[tenant] = template
+            self._key_cache.move_to_end(tenant)
+            if len(self._key_cache) > self._max_cached_keys:
+                self._key_cache.popitem(last=False)
+        return template
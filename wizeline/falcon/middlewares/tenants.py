@@ -0,0 +1,107 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from wizeline.falcon.errors.http import HTTPUnauthorized
+
+TENANT_CONTEXT_KEY = 'tenant'
+
+
+def hash_secret(secret):
+    if isinstance(secret, str):
+        secret = secret.encode('utf-8')
+    return hashlib.sha256(secret).hexdigest()
+
+
+class TenantRegistry:
+    """Maps Authorization secrets to tenant records.
+
+    Secrets are kept as sha256 hex digests only, so a lookup is a single
+    dict access on the digest. Unknown digests are handed to `loader`
+    (when given) and remembered in a negative cache of up to
+    `max_rejected` entries for `rejected_ttl` seconds, so floods of the
+    same bad token neither reach the loader nor grow memory without bound,
+    while tenants created later in the backing store are still found.
+    """
+
+    def __init__(self, tenants=None, loader=None, max_rejected=4096, rejected_ttl=60.0):
+        self._tenants = {}
+        self._loader = loader
+        self._max_rejected = max_rejected
+        self._rejected_ttl = rejected_ttl
+        self._rejected = OrderedDict()
+        self._lock = threading.Lock()
+        for secret, tenant in (tenants or {}).items():
+            self.add(secret, tenant)
+
+    def add(self, secret, tenant):
+        self.add_hashed(hash_secret(secret), tenant)
+
+    def add_hashed(self, digest, tenant):
+        with self._lock:
+            self._tenants[digest] = tenant
+            self._rejected.pop(digest, None)
+
+    def remove(self, secret):
+        with self._lock:
+            return self._tenants.pop(hash_secret(secret), None)
+
+    def lookup(self, secret):
+        if not secret:
+            return None
+
+        digest = hash_secret(secret)
+        tenant = self._tenants.get(digest)
+        if tenant is not None:
+            return tenant
+
+        with self._lock:
+            expires_at = self._rejected.get(digest)
+            if expires_at is not None:
+                if time.monotonic() < expires_at:
+                    self._rejected.move_to_end(digest)
+                    return None
+                del self._rejected[digest]
+
+        tenant = self._loader(digest) if self._loader is not None else None
+        if tenant is not None:
+            self.add_hashed(digest, tenant)
+        else:
+            self._reject(digest)
+        return tenant
+
+    def _reject(self, digest):
+        with self._lock:
+            self._rejected[digest] = time.monotonic() + self._rejected_ttl
+            self._rejected.move_to_end(digest)
+            if len(self._rejected) > self._max_rejected:
+                self._rejected.popitem(last=False)
+
+
+def get_tenant(req):
+    return req.context.get(TENANT_CONTEXT_KEY)
+
+
+class TenantMiddleware:
+    """Attaches the tenant owning the request's Authorization secret.
+
+    The tenant is stored in `req.context['tenant']`. Resources opt out
+    with `is_api_secret_required = False`, like with APISecretMiddleware.
+    """
+
+    def __init__(self, registry, required=True):
+        self._registry = registry
+        self._is_tenant_required = required
+
+    def _is_middleware_enabled(self, resource):
+        return getattr(resource, 'is_api_secret_required', True)
+
+    def process_resource(self, req, resp, resource, params):
+        if not self._is_middleware_enabled(resource):
+            return
+
+        tenant = self._registry.lookup(req.get_header('Authorization'))
+        if tenant is None and self._is_tenant_required:
+            raise HTTPUnauthorized(code='UnknownTenant', message='The request secret does not belong to any tenant')
+        req.context[TENANT_CONTEXT_KEY] = tenant
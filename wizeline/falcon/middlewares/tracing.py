@@ -0,0 +1,272 @@
+import json
+import os
+import random
+import re
+import socket
+import threading
+import time
+import types
+from collections import deque
+
+from falcon import HTTPError
+
+TRACEPARENT_HEADER = 'traceparent'
+SPAN_CONTEXT_KEY = 'trace_span'
+
+_TRACEPARENT = re.compile(r'^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+
+def parse_traceparent(value):
+    """Return (trace_id, parent_id, sampled) from a W3C traceparent header."""
+    if not value:
+        return None
+
+    match = _TRACEPARENT.match(value.strip().lower())
+    if match is None:
+        return None
+
+    version, trace_id, parent_id, flags = match.groups()
+    if version == 'ff' or trace_id == '0' * 32 or parent_id == '0' * 16:
+        return None
+    return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+
+def format_traceparent(span):
+    return f'00-{span.trace_id}-{span.span_id}-{"01" if span.sampled else "00"}'
+
+
+def _new_id(size):
+    return os.urandom(size).hex()
+
+
+class Span:
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'sampled', 'start', 'end', 'attributes', 'error')
+
+    def __init__(self, name, trace_id, parent_id=None, sampled=True):
+        self.trace_id = trace_id
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.sampled = sampled
+        self.start = time.time()
+        self.end = None
+        self.attributes = {}
+        self.error = None
+
+    @property
+    def duration(self):
+        return None if self.end is None else self.end - self.start
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': self.start,
+            'end': self.end,
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+
+class InMemoryExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+
+class FileExporter:
+    """Appends finished spans to a file as JSON lines."""
+
+    def __init__(self, path):
+        self._path = path
+
+    def export(self, spans):
+        with open(self._path, 'a') as file:
+            file.writelines(json.dumps(span.to_dict()) + '\n' for span in spans)
+
+
+class CollectorExporter:
+    """Sends batches of spans as JSON datagrams to a local collector."""
+
+    def __init__(self, host='127.0.0.1', port=6831, max_datagram_size=60000):
+        self._address = (host, port)
+        self._max_datagram_size = max_datagram_size
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def export(self, spans):
+        batch, size = [], 2
+        for span in spans:
+            encoded = json.dumps(span.to_dict())
+            if batch and size + len(encoded) + 1 > self._max_datagram_size:
+                self._send(batch)
+                batch, size = [], 2
+            batch.append(encoded)
+            size += len(encoded) + 1
+        if batch:
+            self._send(batch)
+
+    def _send(self, batch):
+        try:
+            self._socket.sendto(('[' + ','.join(batch) + ']').encode('utf-8'), self._address)
+        except OSError:
+            pass
+
+    def close(self):
+        self._socket.close()
+
+
+class Tracer:
+    """Creates spans and exports the finished ones in the background.
+
+    Finished spans go into a ring buffer of `buffer_size` spans; when the
+    exporter cannot keep up the oldest spans are dropped and counted
+    instead of slowing requests down. Exporter failures are counted in
+    `export_errors` and the spans of the failed batch are dropped.
+    """
+
+    def __init__(self, exporter, buffer_size=2048, flush_interval=1.0, sample_rate=1.0):
+        self._exporter = exporter
+        self._buffer = deque(maxlen=buffer_size)
+        self._flush_interval = flush_interval
+        self._sample_rate = sample_rate
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._worker = None
+        self._pid = None
+        self._stopped = False
+        self.dropped = 0
+        self.export_errors = 0
+
+    def start_span(self, name, parent=None, remote=None):
+        if parent is not None:
+            return Span(name, parent.trace_id, parent.span_id, parent.sampled)
+        if remote is not None:
+            trace_id, parent_id, sampled = remote
+            return Span(name, trace_id, parent_id, sampled)
+        return Span(name, _new_id(16), sampled=random.random() < self._sample_rate)
+
+    def finish(self, span):
+        span.end = time.time()
+        if not span.sampled or self._stopped:
+            return
+
+        with self._lock:
+            pid = os.getpid()
+            if self._pid != pid:
+                # Spans inherited from the parent process are its to export.
+                self._buffer.clear()
+                self._worker = threading.Thread(target=self._run, name='wizeline-tracer', daemon=True)
+                self._worker.start()
+                self._pid = pid
+
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            self._buffer.append(span)
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self._flush_interval)
+            self._wakeup.clear()
+            try:
+                self._export()
+            except Exception:
+                self.export_errors += 1
+
+    def _export(self):
+        with self._lock:
+            spans = list(self._buffer)
+            self._buffer.clear()
+        if spans:
+            self._exporter.export(spans)
+
+    def flush(self):
+        self._export()
+
+    def shutdown(self):
+        self._stopped = True
+        self._wakeup.set()
+        if self._worker is not None and self._pid == os.getpid():
+            self._worker.join()
+        self._export()
+
+    def instrument(self, middleware):
+        """Record a span for each phase of a middleware.
+
+        The middleware's process_resource and process_response are wrapped
+        in place; spans are children of the request span opened by
+        TracingMiddleware, so it must come first in the middleware list.
+        """
+        name = type(middleware).__name__
+        for phase in ('process_resource', 'process_response'):
+            method = getattr(middleware, phase, None)
+            if method is not None:
+                wrapper = _PHASE_WRAPPERS[phase](self, f'{name}.{phase}', method)
+                setattr(middleware, phase, types.MethodType(wrapper, middleware))
+        return middleware
+
+    def _run_phase(self, req, span_name, method, *args):
+        parent = req.context.get(SPAN_CONTEXT_KEY)
+        if parent is None:
+            return method(*args)
+
+        span = self.start_span(span_name, parent=parent)
+        try:
+            return method(*args)
+        except HTTPError as error:
+            span.error = error.status
+            raise
+        except Exception as error:
+            span.error = type(error).__name__
+            raise
+        finally:
+            self.finish(span)
+
+
+def _wrap_process_resource(tracer, span_name, method):
+    def process_resource(self, req, resp, resource, params):
+        return tracer._run_phase(req, span_name, method, req, resp, resource, params)
+    return process_resource
+
+
+def _wrap_process_response(tracer, span_name, method):
+    def process_response(self, req, resp, resource, req_succeeded):
+        return tracer._run_phase(req, span_name, method, req, resp, resource, req_succeeded)
+    return process_response
+
+
+_PHASE_WRAPPERS = {
+    'process_resource': _wrap_process_resource,
+    'process_response': _wrap_process_response,
+}
+
+
+def get_span(req):
+    return req.context.get(SPAN_CONTEXT_KEY)
+
+
+class TracingMiddleware:
+    def __init__(self, tracer):
+        self._tracer = tracer
+
+    def process_request(self, req, resp):
+        remote = parse_traceparent(req.get_header(TRACEPARENT_HEADER))
+        span = self._tracer.start_span('http.request', remote=remote)
+        span.attributes['http.method'] = req.method
+        span.attributes['http.path'] = req.path
+        req.context[SPAN_CONTEXT_KEY] = span
+
+    def process_response(self, req, resp, resource, req_succeeded):
+        span = req.context.get(SPAN_CONTEXT_KEY)
+        if span is None:
+            return
+
+        span.attributes['http.route'] = getattr(req, 'uri_template', None)
+        span.attributes['http.status_code'] = int(resp.status[:3])
+        if not req_succeeded:
+            span.error = resp.status
+        resp.set_header(TRACEPARENT_HEADER, format_traceparent(span))
+        self._tracer.finish(span)